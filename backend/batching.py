@@ -0,0 +1,76 @@
+"""
+Micro-batching of concurrent async calls, shared by the API servers.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+
+class MicroBatcher:
+    """
+    Coalesces items submitted by concurrent callers into one `dispatch` call.
+
+    A worker waits for the first queued item, keeps collecting for `window`
+    seconds (or until `max_batch`), then dispatches the batch in the
+    background and immediately starts assembling the next one. `dispatch`
+    returns one result per item, in order; if it raises, every caller in the
+    batch gets the exception. Until start() is called, submit() dispatches
+    each item on its own.
+    """
+
+    def __init__(self, dispatch: Callable[[List[Any]], Awaitable[Sequence[Any]]],
+                 max_batch: int = 32, window: float = 0.002):
+        self._dispatch = dispatch
+        self.max_batch = max_batch
+        self.window = window
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: set = set()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._spawn(self._collect(self._queue))
+
+    async def stop(self):
+        self._queue = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item; resolves to its slot of the dispatched batch's results."""
+        if self._queue is None:
+            return (await self._dispatch([item]))[0]
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, fut))
+        return await fut
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _collect(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self._spawn(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await self._dispatch([item for item, _ in batch])
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
@@ -0,0 +1,113 @@
+"""
+Small in-process caches shared by the API servers.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+try:
+    import zstandard
+except ImportError:  # summaries are then stored as plain text
+    zstandard = None
+
+ZSTD_LEVEL = 3
+
+
+class TTLCache:
+    """
+    Bounded LRU mapping whose entries expire `ttl` seconds after insertion.
+
+    Operations never await, so a single asyncio event loop can use it
+    without a lock.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_TEXT_FILES: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+def write_text(path: str, text: str) -> str:
+    """
+    Save `text` as `path` + ".zst" (zstd-compressed UTF-8), or as plain
+    `path` if zstandard isn't installed. The other variant is removed so
+    readers can't pick up a stale copy. Returns the path written.
+    """
+    data = text.encode("utf-8")
+    if zstandard is not None:
+        out_path, stale = path + ".zst", path
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        out_path, stale = path, path + ".zst"
+    with open(out_path, "wb") as f:
+        f.write(data)
+    if os.path.exists(stale):
+        os.remove(stale)
+    return out_path
+
+
+def read_text_cached(path: str) -> str:
+    """
+    Contents of a text file saved by write_text() (`path` + ".zst" if
+    present and zstandard is installed, else plain `path`), re-read and
+    decompressed only when the file's mtime or size changes.
+
+    Raises FileNotFoundError like open() if the file is missing.
+    """
+    zst_path = path + ".zst"
+    if zstandard is not None and os.path.exists(zst_path):
+        path = zst_path
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _TEXT_FILES.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(path, "rb") as f:
+        data = f.read()
+    if path == zst_path:
+        data = zstandard.ZstdDecompressor().decompress(data)
+    text = data.decode("utf-8")
+    _TEXT_FILES[path] = (key, text)
+    return text
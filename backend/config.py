@@ -31,6 +31,28 @@ CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
 # Retrieval
 TOP_K_DEFAULT = int(os.getenv("TOP_K", "6"))
 
+# Flat indexes are compressed to 8-bit scalar codes after a build ("sq8") or kept as float32 ("none")
+INDEX_QUANTIZATION = os.getenv("INDEX_QUANTIZATION", "sq8")
+
+# faiss.index_factory spec for the L2 summary index (server2); "" keeps it flat.
+# server2 adds one vector per /summarize_l1, so it stays flat by default; a
+# trained spec such as "IVF100,SQ8" only takes effect once the index holds 4
+# vectors per IVF list (400 here) -- until then apply_index_spec leaves it flat
+SUMMARY_INDEX_SPEC = os.getenv("SUMMARY_INDEX_SPEC", "")
+SUMMARY_INDEX_NPROBE = int(os.getenv("SUMMARY_INDEX_NPROBE", "8"))
+# The L3 corpus (server3) stays tiny, so a graph index that needs no training fits it
+L3_INDEX_SPEC = os.getenv("L3_INDEX_SPEC", "HNSW32")
+
+# Gemini calls in flight at once when map-reducing a summary (server1's L1, server2/3's L2/L3)
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+
+# Gemini calls in flight at once when answering a /query_batch; the MCP client
+# batches at most this many queries, so a batch takes about as long as one query
+ANSWER_CONCURRENCY = int(os.getenv("ANSWER_CONCURRENCY", "8"))
+
+# Outbound MCP calls (attempts per call, including the first)
+MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+
 # API Keys
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
 
@@ -6,12 +6,17 @@ hierarchical document summarization system.
 """
 
 import os
+from functools import lru_cache
 from typing import Dict, List, Optional
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from dotenv import load_dotenv
 
+# Resolved once; ConfigManager() no longer stats for it on every construction
+_BACKEND_DIR = os.path.dirname(__file__)
+_DEFAULT_ENV_PATH = os.path.join(_BACKEND_DIR, ".env")
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class ServerConfig:
     """Configuration for individual summarization servers"""
     name: str
@@ -22,7 +27,7 @@ class ServerConfig:
     description: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SystemConfig:
     """Overall system configuration"""
     # API Configuration
@@ -49,6 +54,88 @@ class SystemConfig:
     max_retries: int
 
 
+@lru_cache(maxsize=1)
+def _load_default_env() -> None:
+    """Load backend/.env once per process, if present."""
+    if os.path.exists(_DEFAULT_ENV_PATH):
+        load_dotenv(_DEFAULT_ENV_PATH)
+
+
+@lru_cache(maxsize=1)
+def _build_config() -> SystemConfig:
+    """Load configuration from environment variables (built once per process)"""
+    
+    # Resolve paths relative to this file's directory
+    _root_dir = os.path.dirname(_BACKEND_DIR)
+    
+    # Base directories
+    pdfs_dir = os.getenv(
+        "PDFS_DIR",
+        os.path.normpath(os.path.join(_BACKEND_DIR, "pdfs"))
+    )
+    
+    summaries_dir = os.path.join(pdfs_dir, "summaries")
+    index_dir = os.getenv(
+        "INDEX_DIR",
+        os.path.normpath(os.path.join(_root_dir, "experiment"))
+    )
+    
+    # Ensure directories exist
+    for path in (pdfs_dir, summaries_dir, index_dir):
+        if not os.path.isdir(path):
+            os.makedirs(path, exist_ok=True)
+    
+    # Server configurations
+    servers = {
+        "server1": ServerConfig(
+            name="server1",
+            port=int(os.getenv("SERVER1_PORT", "8001")),
+            compression_ratio=float(os.getenv("SERVER1_COMPRESSION", "0.1")),
+            max_tokens=int(os.getenv("SERVER1_MAX_TOKENS", "1024")),
+            top_k=int(os.getenv("SERVER1_TOP_K", "8")),
+            description="Full document ingestion and L1 summary"
+        ),
+        "server2": ServerConfig(
+            name="server2",
+            port=int(os.getenv("SERVER2_PORT", "8002")),
+            compression_ratio=float(os.getenv("SERVER2_COMPRESSION", "0.2")),
+            max_tokens=int(os.getenv("SERVER2_MAX_TOKENS", "512")),
+            top_k=int(os.getenv("SERVER2_TOP_K", "5")),
+            description="L2 summary (moderate compression)"
+        ),
+        "server3": ServerConfig(
+            name="server3",
+            port=int(os.getenv("SERVER3_PORT", "8003")),
+            compression_ratio=float(os.getenv("SERVER3_COMPRESSION", "0.1")),
+            max_tokens=int(os.getenv("SERVER3_MAX_TOKENS", "256")),
+            top_k=int(os.getenv("SERVER3_TOP_K", "3")),
+            description="L3 ultra-summary (high compression)"
+        ),
+        "orchestrator": ServerConfig(
+            name="orchestrator",
+            port=int(os.getenv("ORCHESTRATOR_PORT", "8000")),
+            compression_ratio=0.0,  # Not applicable
+            max_tokens=int(os.getenv("ORCHESTRATOR_MAX_TOKENS", "512")),
+            top_k=int(os.getenv("ORCHESTRATOR_TOP_K", "5")),
+            description="Intelligent query router"
+        )
+    }
+    
+    return SystemConfig(
+        google_api_key=os.getenv("GOOGLE_API_KEY", ""),
+        embedding_model=os.getenv("EMBEDDING_MODEL", "models/text-embedding-004"),
+        gemini_model=os.getenv("GEMINI_MODEL", "models/gemini-1.5-flash"),
+        chunk_size=int(os.getenv("CHUNK_SIZE", "1200")),
+        chunk_overlap=int(os.getenv("CHUNK_OVERLAP", "200")),
+        servers=servers,
+        pdfs_dir=pdfs_dir,
+        summaries_dir=summaries_dir,
+        index_dir=index_dir,
+        timeout=float(os.getenv("REQUEST_TIMEOUT", "30.0")),
+        max_retries=int(os.getenv("MAX_RETRIES", "3"))
+    )
+
+
 class ConfigManager:
     """Manages configuration for the multi-server system"""
     
@@ -56,88 +143,12 @@ class ConfigManager:
         # Load environment variables
         if env_file:
             load_dotenv(env_file)
+            # An explicit env file may change values: rebuild instead of reusing
+            _build_config.cache_clear()
         else:
-            # Try to load from backend directory
-            backend_dir = os.path.dirname(__file__)
-            env_path = os.path.join(backend_dir, ".env")
-            if os.path.exists(env_path):
-                load_dotenv(env_path)
+            _load_default_env()
         
-        self._config = self._load_config()
-    
-    def _load_config(self) -> SystemConfig:
-        """Load configuration from environment variables"""
-        
-        # Resolve paths relative to this file's directory
-        _backend_dir = os.path.dirname(__file__)
-        _root_dir = os.path.dirname(_backend_dir)
-        
-        # Base directories
-        pdfs_dir = os.getenv(
-            "PDFS_DIR",
-            os.path.normpath(os.path.join(_backend_dir, "pdfs"))
-        )
-        
-        summaries_dir = os.path.join(pdfs_dir, "summaries")
-        index_dir = os.getenv(
-            "INDEX_DIR",
-            os.path.normpath(os.path.join(_root_dir, "experiment"))
-        )
-        
-        # Ensure directories exist
-        os.makedirs(pdfs_dir, exist_ok=True)
-        os.makedirs(summaries_dir, exist_ok=True)
-        os.makedirs(index_dir, exist_ok=True)
-        
-        # Server configurations
-        servers = {
-            "server1": ServerConfig(
-                name="server1",
-                port=int(os.getenv("SERVER1_PORT", "8001")),
-                compression_ratio=float(os.getenv("SERVER1_COMPRESSION", "0.1")),
-                max_tokens=int(os.getenv("SERVER1_MAX_TOKENS", "1024")),
-                top_k=int(os.getenv("SERVER1_TOP_K", "8")),
-                description="Full document ingestion and L1 summary"
-            ),
-            "server2": ServerConfig(
-                name="server2",
-                port=int(os.getenv("SERVER2_PORT", "8002")),
-                compression_ratio=float(os.getenv("SERVER2_COMPRESSION", "0.2")),
-                max_tokens=int(os.getenv("SERVER2_MAX_TOKENS", "512")),
-                top_k=int(os.getenv("SERVER2_TOP_K", "5")),
-                description="L2 summary (moderate compression)"
-            ),
-            "server3": ServerConfig(
-                name="server3",
-                port=int(os.getenv("SERVER3_PORT", "8003")),
-                compression_ratio=float(os.getenv("SERVER3_COMPRESSION", "0.1")),
-                max_tokens=int(os.getenv("SERVER3_MAX_TOKENS", "256")),
-                top_k=int(os.getenv("SERVER3_TOP_K", "3")),
-                description="L3 ultra-summary (high compression)"
-            ),
-            "orchestrator": ServerConfig(
-                name="orchestrator",
-                port=int(os.getenv("ORCHESTRATOR_PORT", "8000")),
-                compression_ratio=0.0,  # Not applicable
-                max_tokens=int(os.getenv("ORCHESTRATOR_MAX_TOKENS", "512")),
-                top_k=int(os.getenv("ORCHESTRATOR_TOP_K", "5")),
-                description="Intelligent query router"
-            )
-        }
-        
-        return SystemConfig(
-            google_api_key=os.getenv("GOOGLE_API_KEY", ""),
-            embedding_model=os.getenv("EMBEDDING_MODEL", "models/text-embedding-004"),
-            gemini_model=os.getenv("GEMINI_MODEL", "models/gemini-1.5-flash"),
-            chunk_size=int(os.getenv("CHUNK_SIZE", "1200")),
-            chunk_overlap=int(os.getenv("CHUNK_OVERLAP", "200")),
-            servers=servers,
-            pdfs_dir=pdfs_dir,
-            summaries_dir=summaries_dir,
-            index_dir=index_dir,
-            timeout=float(os.getenv("REQUEST_TIMEOUT", "30.0")),
-            max_retries=int(os.getenv("MAX_RETRIES", "3"))
-        )
+        self._config = _build_config()
     
     @property
     def config(self) -> SystemConfig:
@@ -193,14 +204,7 @@ class ConfigManager:
             "chunk_size": self._config.chunk_size,
             "chunk_overlap": self._config.chunk_overlap,
             "servers": {
-                name: {
-                    "name": server.name,
-                    "port": server.port,
-                    "compression_ratio": server.compression_ratio,
-                    "max_tokens": server.max_tokens,
-                    "top_k": server.top_k,
-                    "description": server.description
-                }
+                name: asdict(server)
                 for name, server in self._config.servers.items()
             },
             "paths": {
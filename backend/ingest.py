@@ -1,23 +1,30 @@
 # ingest.py
+import hashlib
 import os
-from typing import List, Dict, Any, Tuple
+import stat
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 
 from pypdf import PdfReader
 
 from backend import config
-from backend.rag import GeminiClient  # NEW import
+from backend.rag import get_gemini_client
+
+PDF_READ_BUFFER = 1 << 20  # 1 MiB
 
 
 def read_pdf_with_pages(file_path: str) -> List[Tuple[int, str]]:
     pages: List[Tuple[int, str]] = []
-    reader = PdfReader(file_path)
-    for i, page in enumerate(reader.pages):
-        try:
-            text = page.extract_text() or ""
-        except Exception:
-            text = ""
-        if text.strip():
-            pages.append((i + 1, _clean_text(text)))
+    # pypdf issues many small reads and seeks; a large buffer serves them from memory
+    with open(file_path, "rb", buffering=PDF_READ_BUFFER) as stream:
+        reader = PdfReader(stream, strict=False)
+        for i, page in enumerate(reader.pages):
+            try:
+                text = page.extract_text() or ""
+            except Exception:
+                text = ""
+            if text.strip():
+                pages.append((i + 1, _clean_text(text)))
     return pages
 
 
@@ -72,35 +79,69 @@ def split_into_chunks(pages: List[Tuple[int, str]], chunk_size: int, chunk_overl
     return chunks
 
 
-def ingest_pdfs(pdf_dir: str | None = None) -> List[Dict[str, Any]]:
-    """Ingest PDFs and return chunks"""
+@lru_cache(maxsize=8)
+def _pdf_names(base: str, dir_mtime_ns: int) -> Tuple[str, ...]:
+    """Sorted PDF names in `base`; the directory mtime in the key drops stale listings"""
+    return tuple(sorted(f for f in os.listdir(base) if f.lower().endswith(".pdf")))
+
+
+def list_pdf_files(pdf_dir: str | None = None, files: Optional[List[str]] = None) -> List[str]:
+    """Sorted PDF paths in `pdf_dir` (only the named `files` when given)"""
     base = pdf_dir or config.PDFS_DIR
-    if not os.path.isdir(base):
+    try:
+        st = os.stat(base)
+    except FileNotFoundError:
+        st = None
+    if st is None or not stat.S_ISDIR(st.st_mode):
         raise FileNotFoundError(f"PDF directory not found: {base}")
 
-    pdf_files = [os.path.join(base, f) for f in os.listdir(base) if f.lower().endswith(".pdf")]
-    pdf_files.sort()
+    wanted = None if files is None else {os.path.basename(f) for f in files}
+    return [
+        os.path.join(base, f) for f in _pdf_names(base, st.st_mtime_ns)
+        if wanted is None or f in wanted
+    ]
+
+
+def parse_one_pdf(file_path: str) -> List[Dict[str, Any]]:
+    """Read one PDF and return its chunks"""
+    file_pages = read_pdf_with_pages(file_path)
+    chunks = split_into_chunks(file_pages, config.CHUNK_SIZE, config.CHUNK_OVERLAP)
+    print(f"[INGEST] {os.path.basename(file_path)}: {len(file_pages)} pages, {len(chunks)} chunks")
+    for ch in chunks:
+        ch["source_file"] = os.path.basename(file_path)
+    return chunks
+
+
+def ingest_pdfs(pdf_dir: str | None = None, files: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Ingest PDFs and return chunks (only the named `files` when given)"""
+    pdf_files = list_pdf_files(pdf_dir, files)
     all_chunks: List[Dict[str, Any]] = []
-    print(f"[INGEST] Found {len(pdf_files)} PDF files in {base}")
+    print(f"[INGEST] Found {len(pdf_files)} PDF files in {pdf_dir or config.PDFS_DIR}")
     for idx, file_path in enumerate(pdf_files, start=1):
         print(f"[INGEST] ({idx}/{len(pdf_files)}) Reading: {os.path.basename(file_path)}")
-        file_pages = read_pdf_with_pages(file_path)
-        print(f"[INGEST] Pages extracted: {len(file_pages)}")
-        chunks = split_into_chunks(file_pages, config.CHUNK_SIZE, config.CHUNK_OVERLAP)
-        print(f"[INGEST] Chunks created: {len(chunks)}")
-        for ch in chunks:
-            ch["source_file"] = os.path.basename(file_path)
-        all_chunks.extend(chunks)
+        all_chunks.extend(parse_one_pdf(file_path))
     print(f"[INGEST] Total chunks: {len(all_chunks)} from {len(pdf_files)} files")
     return all_chunks
 
 
+def dedupe_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop chunks whose text exactly repeats an earlier one (boilerplate pages, headers)"""
+    seen = set()
+    unique: List[Dict[str, Any]] = []
+    for ch in chunks:
+        h = hashlib.blake2b(ch["text"].encode("utf-8"), digest_size=16).digest()
+        if h not in seen:
+            seen.add(h)
+            unique.append(ch)
+    return unique
+
+
 def summarize_text(text: str, target_ratio: float = 0.1, api_key: str = None) -> str:
     """Summarize text to approximately target_ratio length"""
     if not api_key:
         raise RuntimeError("GOOGLE_API_KEY not set for summarization.")
 
-    llm = GeminiClient(model_name="gemini-1.5-flash", api_key=api_key)
+    llm = get_gemini_client("gemini-1.5-flash", api_key)
     prompt = (
         f"Summarize the following document into a shorter version of about {int(target_ratio*100)}% length. "
         f"Keep the key context and important points:\n\n{text}"
@@ -3,18 +3,29 @@ Advanced Multi-Level Summarization Orchestrator V2 (fixed)
 """
 import asyncio
 import logging
+import os
+import re
 import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import Dict, Optional, Tuple, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 import httpx
+import orjson
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from urllib.parse import urlsplit
 from pydantic import BaseModel
 
+from backend.cache import TTLCache
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
+# httpx logs every request at INFO; keep only its warnings
+logging.getLogger("httpx").setLevel(logging.WARNING)
 
 
 # --- API Models ---
@@ -25,6 +36,16 @@ class QueryRequest(BaseModel):
     target_server: Optional[str] = None
 
 
+# Build payloads robustly (support pydantic v1 & v2); chosen once at import
+if hasattr(QueryRequest, "model_dump"):
+    def _dump(request: QueryRequest) -> Dict[str, Any]:
+        return request.model_dump()
+else:
+    def _dump(request: QueryRequest) -> Dict[str, Any]:
+        # fallback to pydantic v1 .dict()
+        return request.dict()
+
+
 # --- Enums and Data Classes ---
 class QueryComplexity(Enum):
     SIMPLE = "simple"
@@ -39,32 +60,145 @@ class ServerConfig:
     url: str
     level: int
     description: str
+    # derived once from `url`
+    query_url: str = field(init=False, repr=False)
+    health_url: str = field(init=False, repr=False)
+    stats_url: str = field(init=False, repr=False)
+    ingest_url: str = field(init=False, repr=False)
+    port: str = field(init=False, repr=False)
+
+    def __post_init__(self):
+        base = self.url.rstrip("/")
+        self.query_url = f"{base}/query"
+        self.health_url = f"{base}/health"
+        self.stats_url = f"{base}/stats"
+        self.ingest_url = f"{base}/ingest"
+        port = urlsplit(self.url).port
+        # reported as a string, as /system/health always has
+        self.port = str(port) if port is not None else self.url
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+# preset -> (consecutive failures before opening, seconds before a probe)
+BREAKER_PRESETS: Dict[str, Tuple[int, float]] = {
+    "tolerant": (10, 15.0),
+    "balanced": (5, 30.0),
+    "fast_failure": (2, 60.0),
+}
+BREAKER_PRESET = os.getenv("ORCH_BREAKER_PRESET", "balanced").lower()
+
+
+@dataclass
+class CircuitBreaker:
+    """Per-server breaker: stop calling a server after repeated failures, probe it later."""
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    state: BreakerState = BreakerState.CLOSED
+    failure_count: int = 0
+    opened_at: float = 0.0
+    half_open_inflight: bool = field(default=False, repr=False)
+
+    def allow(self) -> bool:
+        if self.state is BreakerState.CLOSED:
+            return True
+        if self.state is BreakerState.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = BreakerState.HALF_OPEN
+        # HALF_OPEN: let exactly one probe through
+        if self.half_open_inflight:
+            return False
+        self.half_open_inflight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = BreakerState.CLOSED
+        self.failure_count = 0
+        self.half_open_inflight = False
+
+    def record_failure(self) -> None:
+        self.failure_count += 1
+        self.half_open_inflight = False
+        if self.state is BreakerState.HALF_OPEN or self.failure_count >= self.failure_threshold:
+            self.state = BreakerState.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Attempt ended without a verdict (e.g. cancelled by hedging)."""
+        self.half_open_inflight = False
+
+
+def _timeout(connect: float, read: float, write: float, pool: float) -> httpx.Timeout:
+    return httpx.Timeout(connect=connect, read=read, write=write, pool=pool)
+
+
+# profile -> per-call-type timeouts. Connect/pool budgets are short so a dead
+# server fails over quickly; read budgets cover LLM generation / ingestion.
+TIMEOUT_PROFILES: Dict[str, Dict[str, httpx.Timeout]] = {
+    "fast": {
+        "query": _timeout(connect=0.5, read=15.0, write=2.0, pool=0.5),
+        "health": _timeout(connect=0.25, read=1.0, write=1.0, pool=0.25),
+        "ingest": _timeout(connect=1.0, read=300.0, write=5.0, pool=1.0),
+    },
+    "balanced": {
+        "query": _timeout(connect=1.0, read=30.0, write=5.0, pool=1.0),
+        "health": _timeout(connect=0.5, read=2.0, write=1.0, pool=0.5),
+        "ingest": _timeout(connect=2.0, read=300.0, write=5.0, pool=2.0),
+    },
+    "tolerant": {
+        "query": _timeout(connect=3.0, read=60.0, write=10.0, pool=3.0),
+        "health": _timeout(connect=1.0, read=4.0, write=2.0, pool=1.0),
+        "ingest": _timeout(connect=5.0, read=600.0, write=10.0, pool=5.0),
+    },
+}
+TIMEOUT_PROFILE = os.getenv("ORCH_TIMEOUT_PROFILE", "balanced").lower()
+TIMEOUTS = TIMEOUT_PROFILES.get(TIMEOUT_PROFILE, TIMEOUT_PROFILES["balanced"])
+
+
+_JSON_HEADERS = {"content-type": "application/json"}
 
 
 # --- Core Logic Components ---
 class QueryAnalyzer:
-    KEYWORD_MAP = {
-        QueryComplexity.COMPREHENSIVE: {"comprehensive", "full document", "entire policy"},
-        QueryComplexity.DETAILED: {"detailed", "section", "specific", "what are the"},
-        QueryComplexity.MODERATE: {"summary", "overview", "describe", "explain"},
-        QueryComplexity.SIMPLE: {"key points", "bullet points", "concise", "short"},
+    # lowercase keywords; frozen so the compiled pattern below cannot drift
+    KEYWORD_MAP: Dict[QueryComplexity, frozenset] = {
+        QueryComplexity.COMPREHENSIVE: frozenset({"comprehensive", "full document", "entire policy"}),
+        QueryComplexity.DETAILED: frozenset({"detailed", "section", "specific", "what are the"}),
+        QueryComplexity.MODERATE: frozenset({"summary", "overview", "describe", "explain"}),
+        QueryComplexity.SIMPLE: frozenset({"key points", "bullet points", "concise", "short"}),
+    }
+    # Prefer more specific matches first (comprehensive/detailed)
+    ORDER = [
+        QueryComplexity.COMPREHENSIVE,
+        QueryComplexity.DETAILED,
+        QueryComplexity.MODERATE,
+        QueryComplexity.SIMPLE,
+    ]
+    # One case-insensitive alternation per bucket (longest keyword first), so
+    # each bucket is a single C-level scan and no lowercased copy is made
+    _PATTERNS: Dict[QueryComplexity, "re.Pattern[str]"] = {
+        complexity: re.compile("|".join(map(re.escape, sorted(kws, key=len, reverse=True))), re.IGNORECASE)
+        for complexity, kws in KEYWORD_MAP.items()
     }
 
     @classmethod
     def analyze_query(cls, query: str) -> Tuple[QueryComplexity, float]:
-        query_lower = (query or "").lower()
-        # Prefer more specific matches first (comprehensive/detailed)
-        order = [
-            QueryComplexity.COMPREHENSIVE,
-            QueryComplexity.DETAILED,
-            QueryComplexity.MODERATE,
-            QueryComplexity.SIMPLE,
-        ]
-        for complexity in order:
-            keywords = cls.KEYWORD_MAP.get(complexity, set())
-            if any(kw in query_lower for kw in keywords):
-                return complexity, 0.85
-        return QueryComplexity.MODERATE, 0.4
+        return _analyze_cached(query or "")
+
+
+@lru_cache(maxsize=4096)
+def _analyze_cached(query: str) -> Tuple[QueryComplexity, float]:
+    """Memoized QueryAnalyzer scan; repeated/templated questions skip the regex."""
+    # Prefer more specific matches first; the first bucket that hits wins
+    for complexity in QueryAnalyzer.ORDER:
+        if QueryAnalyzer._PATTERNS[complexity].search(query):
+            return complexity, 0.85
+    return QueryComplexity.MODERATE, 0.4
 
 
 class ServerManager:
@@ -75,7 +209,19 @@ class ServerManager:
             "server3": ServerConfig(name="Server 3", url="http://localhost:8003", level=3, description="Key points index"),
         }
         # default timeout for query_server
-        self.timeout = httpx.Timeout(60.0)
+        self.timeout = TIMEOUTS["query"]
+        # shared pooled client, opened/closed by the app lifespan
+        self.http: Optional[httpx.AsyncClient] = None
+        # short-lived /system/health result so polling dashboards share one probe round
+        self._health_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._health_lock = asyncio.Lock()
+        self.health_ttl = 2.0
+        self.health_timeout = TIMEOUTS["health"]
+        threshold, reset_timeout = BREAKER_PRESETS.get(BREAKER_PRESET, BREAKER_PRESETS["balanced"])
+        self._breakers: Dict[str, CircuitBreaker] = {
+            name: CircuitBreaker(failure_threshold=threshold, reset_timeout=reset_timeout)
+            for name in self.servers
+        }
 
     async def get_server_health(self, server_name: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
         cfg = self.servers.get(server_name)
@@ -84,58 +230,159 @@ class ServerManager:
             return False, None
 
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                res = await client.get(f"{cfg.url.rstrip('/')}/health")
-                # Safe parse
-                try:
-                    body = res.json() if res.content else None
-                except Exception:
-                    body = {"raw_text": res.text}
-                return res.status_code == 200, body
+            res = await self.http.get(cfg.health_url, timeout=self.health_timeout)
+            # Safe parse
+            try:
+                body = orjson.loads(res.content) if res.content else None
+            except Exception:
+                body = {"raw_text": res.text}
+            return res.status_code == 200, body
         except Exception as exc:
             logger.debug("Health check error for %s: %s", server_name, exc)
             return False, None
 
+    def is_circuit_open(self, server_name: str) -> bool:
+        breaker = self._breakers.get(server_name)
+        return breaker is not None and breaker.state is BreakerState.OPEN
+
+    async def get_server_stats(self, server_name: str) -> Dict[str, Any]:
+        cfg = self.servers.get(server_name)
+        if cfg is None:
+            raise HTTPException(status_code=400, detail=f"Unknown server '{server_name}'")
+        res = await self.http.get(cfg.stats_url, timeout=self.health_timeout)
+        if res.status_code >= 400:
+            raise HTTPException(status_code=res.status_code, detail=f"{server_name} /stats returned {res.status_code}")
+        return orjson.loads(res.content)
+
+    async def get_aggregated_stats(self) -> Dict[str, Any]:
+        """Index stats from every server, fetched concurrently."""
+        names = list(self.servers)
+        results = await asyncio.gather(*(self.get_server_stats(n) for n in names), return_exceptions=True)
+        return {n: r if not isinstance(r, Exception) else {"error": str(r)} for n, r in zip(names, results)}
+
+    async def get_system_health(self) -> Dict[str, Any]:
+        """Consolidated health of all servers, cached for `health_ttl` seconds."""
+        cached = self._health_cache
+        if cached is not None and time.monotonic() - cached[0] < self.health_ttl:
+            return cached[1]
+
+        async with self._health_lock:
+            # another caller may have refreshed while we waited
+            cached = self._health_cache
+            if cached is not None and time.monotonic() - cached[0] < self.health_ttl:
+                return cached[1]
+
+            names = list(self.servers.keys())
+            try:
+                results = await asyncio.wait_for(
+                    asyncio.gather(*(self.get_server_health(n) for n in names), return_exceptions=True),
+                    timeout=5.0,
+                )
+            except asyncio.TimeoutError:
+                results = [(False, None)] * len(names)
+
+            statuses = {}
+            healthy_count = 0
+            for name, result in zip(names, results):
+                cfg = self.servers[name]
+                running, data = (False, None) if isinstance(result, BaseException) else result
+                if running:
+                    healthy_count += 1
+                statuses[name] = {"name": cfg.name, "port": cfg.port, "description": cfg.description, "running": running, "health": data}
+
+            overall = "degraded"
+            if healthy_count == len(statuses):
+                overall = "healthy"
+            elif healthy_count == 0:
+                overall = "unhealthy"
+
+            snapshot = {"timestamp": time.time(), "servers": statuses, "overall_health": overall, "healthy_count": healthy_count, "total_count": len(statuses)}
+            self._health_cache = (time.monotonic(), snapshot)
+            return snapshot
+
     async def query_server(self, server_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         cfg = self.servers.get(server_name)
         if cfg is None:
             raise HTTPException(status_code=400, detail=f"Unknown server '{server_name}'")
 
+        breaker = self._breakers[server_name]
+        if not breaker.allow():
+            raise HTTPException(status_code=503, detail=f"{server_name} is unavailable: circuit open")
+
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(f"{cfg.url.rstrip('/')}/query", json=payload)
-                response.raise_for_status()
-                # response.json() can raise; guard it
+            response = await self.http.post(cfg.query_url, content=orjson.dumps(payload), headers=_JSON_HEADERS, timeout=self.timeout)
+            status_code = response.status_code
+            if status_code >= 400:
+                # only server-side errors count against the breaker
+                if status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                # Attempt to extract meaningful detail if possible
                 try:
-                    return response.json()
+                    detail = orjson.loads(response.content)
                 except Exception:
-                    return {"raw_text": response.text}
-        except httpx.HTTPStatusError as e:
-            # Attempt to extract meaningful detail if possible
-            detail = None
+                    detail = {"status_text": response.text}
+                # wrap as HTTPException so FastAPI can handle it smoothly
+                raise HTTPException(status_code=status_code, detail=detail)
+            breaker.record_success()
+            # parsing can raise; guard it
             try:
-                detail = e.response.json()
+                return orjson.loads(response.content)
             except Exception:
-                detail = {"status_text": e.response.text}
-            # wrap as HTTPException so FastAPI can handle it smoothly
-            raise HTTPException(status_code=e.response.status_code, detail=detail)
+                return {"raw_text": response.text}
         except httpx.RequestError as e:
+            breaker.record_failure()
             logger.error("RequestError when contacting %s: %s", server_name, e)
             raise HTTPException(status_code=503, detail=f"{server_name} is unavailable: {str(e)}")
+        finally:
+            breaker.release()
+
+
+# Routing tables: complexity -> primary server, server -> fallbacks in order
+_PRIMARY_BY_COMPLEXITY: Dict[QueryComplexity, str] = {
+    QueryComplexity.SIMPLE: "server3",
+    QueryComplexity.MODERATE: "server2",
+    QueryComplexity.DETAILED: "server1",
+    QueryComplexity.COMPREHENSIVE: "server1",
+}
+_FALLBACKS: Dict[str, Tuple[str, ...]] = {
+    "server1": ("server2",),
+    "server2": ("server1",),
+    "server3": ("server2",),
+}
+
+
+# Seconds to wait on the primary before hedging with the fallback; roughly the
+# primary's slow-tail latency, longer for heavier answers.
+_HEDGE_DELAY: Dict[QueryComplexity, float] = {
+    QueryComplexity.SIMPLE: 2.0,
+    QueryComplexity.MODERATE: 3.0,
+    QueryComplexity.DETAILED: 5.0,
+    QueryComplexity.COMPREHENSIVE: 8.0,
+}
 
 
 class IntelligentRouter:
     def __init__(self, server_manager: ServerManager):
         self.server_manager = server_manager
         self.query_analyzer = QueryAnalyzer()
+        # (target, question, top_k, max_output_tokens) -> (fresh_until, result).
+        # Entries are served fresh for `result_ttl` seconds and kept for an
+        # hour as a stale fallback while the target's circuit is open.
+        self.result_ttl = 60.0
+        self._result_cache = TTLCache(maxsize=1024, ttl=3600.0)
 
     def select_primary_server(self, complexity: QueryComplexity) -> str:
-        mapping = {
-            QueryComplexity.SIMPLE.value: "server3",
-            QueryComplexity.MODERATE.value: "server2",
-            # default for detailed/comprehensive -> server1
-        }
-        return mapping.get(complexity.value, "server1")
+        return _PRIMARY_BY_COMPLEXITY[complexity]
+
+    def get_fallback_servers(self, primary: str) -> Tuple[str, ...]:
+        return _FALLBACKS.get(primary, ("server1",))
+
+    @staticmethod
+    def _from_cache(result: Dict[str, Any], status: str) -> Dict[str, Any]:
+        # copy so callers never mutate the cached entry
+        return {**result, "routing_info": {**result.get("routing_info", {}), "cache": status}}
 
     async def route_query(self, request: QueryRequest) -> Dict[str, Any]:
         # If the client specified a target server, use it (but validate)
@@ -144,47 +391,97 @@ class IntelligentRouter:
 
         if not target or target not in self.server_manager.servers:
             target = self.select_primary_server(complexity)
-            logger.info("Analyzed as %s, routing to %s", complexity.value, target)
+            logger.info("Query analysis: %s (confidence: %.2f) -> %s", complexity.value, confidence, target)
         else:
             logger.info("Manual override to %s", target)
 
-        # Build payload robustly (support pydantic v1 & v2)
-        if hasattr(request, "model_dump"):
-            payload = request.model_dump()
-        else:
-            # fallback to pydantic v1 .dict()
-            payload = request.dict()
-
-        # Try primary, then fallback mapping
+        cache_key = (target, request.question, request.top_k, request.max_output_tokens)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None and time.monotonic() < cached[0]:
+            return self._from_cache(cached[1], "hit")
+
+        payload = _dump(request)
+
+        # Start the primary; if it fails, or is still running after the hedge
+        # delay, race the fallback against it and keep the first success.
+        fallback = self.get_fallback_servers(target)[0]
+        tasks = {asyncio.create_task(self.server_manager.query_server(target, payload)): target}
+        pending = set(tasks)
+        errors: Dict[str, Any] = {}
+        hedged = False
+        timeout: Optional[float] = _HEDGE_DELAY[complexity]
         try:
-            result = await self.server_manager.query_server(target, payload)
-            # ensure it's a dict
-            if not isinstance(result, dict):
-                result = {"result": result}
-            result["routing_info"] = {"primary_server": target, "complexity": complexity.value, "confidence": confidence}
-            return result
-        except HTTPException as outer_exc:
-            # If primary server fails, attempt sensible fallback
-            logger.warning("Primary server %s failed with: %s. Attempting fallback.", target, outer_exc.detail)
-            fallback_map = {"server1": "server2", "server2": "server1", "server3": "server2"}
-            fallback = fallback_map.get(target, "server1")
-            try:
-                result = await self.server_manager.query_server(fallback, payload)
-                if not isinstance(result, dict):
-                    result = {"result": result}
-                result["routing_info"] = {"primary_server": target, "fallback_server": fallback, "complexity": complexity.value, "confidence": confidence}
-                return result
-            except HTTPException as exc2:
-                # Both primary and fallback failed -> surface error
-                logger.error("Fallback server %s also failed: %s", fallback, exc2.detail)
-                raise HTTPException(status_code=503, detail={"error": "Both primary and fallback servers failed", "primary_error": outer_exc.detail, "fallback_error": exc2.detail})
+            while pending or fallback not in tasks.values():
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    server = tasks[task]
+                    try:
+                        result = task.result()
+                    except HTTPException as exc:
+                        logger.warning("Server %s failed with: %s", server, exc.detail)
+                        errors[server] = exc.detail
+                        continue
+                    # ensure it's a dict
+                    if not isinstance(result, dict):
+                        result = {"result": result}
+                    routing_info = {"primary_server": target, "complexity": complexity.value, "confidence": confidence}
+                    if server != target:
+                        routing_info["fallback_server"] = server
+                    if hedged:
+                        routing_info["hedged"] = True
+                    result["routing_info"] = routing_info
+                    self._result_cache.set(cache_key, (time.monotonic() + self.result_ttl, result))
+                    return result
+
+                if fallback not in tasks.values():
+                    hedged = bool(pending)
+                    if hedged:
+                        logger.info("Primary server %s slow, hedging with %s", target, fallback)
+                    tasks[asyncio.create_task(self.server_manager.query_server(fallback, payload))] = fallback
+                    pending = {t for t in tasks if not t.done()}
+                    timeout = None
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        # Both primary and fallback failed -> degrade to the last good answer
+        # if the target is known-dead, else surface error
+        if cached is not None and self.server_manager.is_circuit_open(target):
+            logger.warning("Serving stale cached answer for %s (circuit open)", target)
+            return self._from_cache(cached[1], "stale")
+        logger.error("Primary %s and fallback %s both failed", target, fallback)
+        raise HTTPException(status_code=503, detail={"error": "Both primary and fallback servers failed", "primary_error": errors.get(target), "fallback_error": errors.get(fallback)})
 
 
 # --- FastAPI App Setup ---
-app = FastAPI(title="Advanced Summarization Orchestrator", version="2.0.0")
 server_manager = ServerManager()
 router = IntelligentRouter(server_manager)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open one keep-alive connection pool for all downstream calls."""
+    server_manager.http = httpx.AsyncClient(
+        timeout=TIMEOUTS["query"],
+        # negotiated over TLS/ALPN only; plain http:// servers stay on HTTP/1.1
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=64, max_connections=128, keepalive_expiry=30),
+    )
+    try:
+        yield
+    finally:
+        await server_manager.http.aclose()
+        server_manager.http = None
+
+
+app = FastAPI(
+    title="Advanced Summarization Orchestrator",
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
 # allow development origin; adapt in production
 app.add_middleware(
     CORSMiddleware,
@@ -205,54 +502,39 @@ async def health_check():
 @app.get("/system/health")
 async def get_system_health():
     """Provides a consolidated health status of all downstream servers."""
-    # prepare coroutines in insertion order
-    tasks = [server_manager.get_server_health(n) for n in server_manager.servers.keys()]
-    results = await asyncio.gather(*tasks)
-
-    statuses = {}
-    healthy_count = 0
-    for (name, cfg), (running, data) in zip(server_manager.servers.items(), results):
-        if running:
-            healthy_count += 1
-        # extract port safely (may not exist)
-        port = None
-        try:
-            # naive attempt to get final part after last ':'
-            port = cfg.url.rsplit(":", 1)[-1]
-        except Exception:
-            port = cfg.url
-        statuses[name] = {"name": cfg.name, "port": port, "description": cfg.description, "running": running, "health": data}
+    return await server_manager.get_system_health()
 
-    overall = "degraded"
-    if healthy_count == len(statuses):
-        overall = "healthy"
-    elif healthy_count == 0:
-        overall = "unhealthy"
 
-    return {"timestamp": time.time(), "servers": statuses, "overall_health": overall, "healthy_count": healthy_count, "total_count": len(statuses)}
+@app.get("/system/stats")
+async def get_system_stats():
+    """Index statistics of all downstream servers."""
+    return {"timestamp": time.time(), "servers": await server_manager.get_aggregated_stats()}
 
 
 @app.post("/ingest")
 async def ingest_documents(request: Request):
-    """Forwards ingestion requests to Server 1."""
+    """Forwards ingestion requests to Server 1, streaming both bodies through unparsed."""
     cfg = server_manager.servers.get("server1")
     if cfg is None:
         raise HTTPException(status_code=500, detail="Ingestion server not configured.")
 
+    client = server_manager.http
     try:
-        body = await request.json()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
-
-    try:
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            res = await client.post(f"{cfg.url.rstrip('/')}/ingest", json=body)
-            # try to forward body and status code transparently
-            try:
-                content = res.json() if res.content else None
-            except Exception:
-                content = {"raw_text": res.text}
-            return JSONResponse(status_code=res.status_code, content=content)
+        upstream = client.build_request(
+            "POST",
+            cfg.ingest_url,
+            content=request.stream(),
+            headers={"content-type": request.headers.get("content-type", "application/json")},
+            timeout=TIMEOUTS["ingest"],
+        )
+        res = await client.send(upstream, stream=True)
+        # forward status code and body transparently; close upstream once relayed
+        return StreamingResponse(
+            res.aiter_bytes(),
+            status_code=res.status_code,
+            media_type=res.headers.get("content-type"),
+            background=BackgroundTask(res.aclose),
+        )
     except httpx.RequestError as e:
         logger.error("Ingestion request to server1 failed: %s", e)
         raise HTTPException(status_code=503, detail=f"Ingestion failed: {e}")
@@ -262,5 +544,26 @@ async def ingest_documents(request: Request):
 async def intelligent_query(request: QueryRequest):
     """Handles intelligent query routing and returns the result."""
     result = await router.route_query(request)
-    # Return as JSONResponse to avoid FastAPI double-encoding possible HTTPException content
-    return JSONResponse(content=result)
+    # Return the response directly to avoid FastAPI double-encoding possible HTTPException content
+    return ORJSONResponse(content=result)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    try:
+        import uvloop  # noqa: F401  (no Windows build)
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    # Breakers, health and result caches live in each worker process; they
+    # are not shared across workers (that would need an external store).
+    workers = int(os.getenv("ORCH_WORKERS", os.cpu_count() or 2))
+    uvicorn.run(
+        "backend.orchestrator:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=workers,
+        loop=loop,
+        http="httptools",
+    )
@@ -1,14 +1,23 @@
-from typing import List, Dict, Any
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Iterator, List, Dict, Any, Optional, Tuple
 
 import numpy as np
 import google.generativeai as genai
 
 from backend import config
+from backend.batching import MicroBatcher
+from backend.cache import TTLCache
 from backend.vectorstore import FaissStore
 
+logger = logging.getLogger(__name__)
+
 
 class EmbeddingsClient:
-    def __init__(self, model_name: str, api_key: str, batch_size: int = 64):
+    # 100 texts is the most one Gemini embedding request accepts
+    def __init__(self, model_name: str, api_key: str, batch_size: int = 100):
         if not api_key:
             raise RuntimeError("GOOGLE_API_KEY not set. Please configure your environment.")
         genai.configure(api_key=api_key)
@@ -22,7 +31,8 @@ class EmbeddingsClient:
         total = len(texts)
         for i in range(0, total, self.batch_size):
             batch = texts[i:i + self.batch_size]
-            print(f"[EMBED] Embedding batch {i//self.batch_size + 1}/{(total + self.batch_size - 1)//self.batch_size} (size={len(batch)})")
+            logger.debug("[EMBED] Embedding batch %d/%d (size=%d)", i // self.batch_size + 1,
+                         (total + self.batch_size - 1) // self.batch_size, len(batch))
             resp = genai.embed_content(model=self.model_name, content=batch, task_type="retrieval_document")
             if isinstance(resp, dict) and "embeddings" in resp:
                 vectors = [np.array(item["values"], dtype=np.float32) for item in resp["embeddings"]]
@@ -40,28 +50,109 @@ class EmbeddingsClient:
         return np.vstack(batches) if batches else np.zeros((0, 768), dtype=np.float32)
 
 
+# summarize_map_reduce() splits inputs longer than this (~8k tokens) into shards,
+# summarized with at most config.SUMMARY_CONCURRENCY Gemini calls in flight
+SUMMARY_SHARD_CHARS = 30_000
+
+SUMMARIZE_SYSTEM_PROMPT = (
+    "You summarize documents. Keep all important information, key points, and factual details. "
+    "Maintain the structure and organization of the original text."
+)
+
+
 class GeminiClient:
     def __init__(self, model_name: str, api_key: str):
         if not api_key:
             raise RuntimeError("GOOGLE_API_KEY not set. Please configure your environment.")
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
+        # The fixed summarization instructions ride as a system instruction, so
+        # every summarize() call shares an identical prompt prefix
+        self.summarizer = genai.GenerativeModel(model_name, system_instruction=SUMMARIZE_SYSTEM_PROMPT)
 
     def generate(self, prompt: str, max_output_tokens: int = 512) -> str:
-        print("[LLM] Prompt to Gemini:\n" + (prompt if len(prompt) < 4000 else prompt[:4000] + "\n... [truncated]"))
-        print("[LLM] Generating answer with Gemini…")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[LLM] Prompt to Gemini:\n%s", prompt if len(prompt) < 4000 else prompt[:4000] + "\n... [truncated]")
+        logger.info("[LLM] Generating answer with Gemini…")
         response = self.model.generate_content(prompt, generation_config={"max_output_tokens": max_output_tokens})
         return (response.text or "").strip()
 
+    def generate_stream(self, prompt: str, max_output_tokens: int = 512) -> Iterator[str]:
+        """Yield the answer text piece by piece as Gemini produces it."""
+        logger.info("[LLM] Streaming answer from Gemini…")
+        response = self.model.generate_content(
+            prompt, generation_config={"max_output_tokens": max_output_tokens}, stream=True
+        )
+        for chunk in response:
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+
     def summarize(self, text: str, target_ratio: float = 0.2) -> str:
         """Summarize text to approximately target_ratio of original length."""
         prompt = (
-            f"Please summarize the following text, reducing it to approximately {int(target_ratio * 100)}% of its original length. "
-            f"Keep all important information, key points, and factual details. "
-            f"Maintain the structure and organization of the original text.\n\n"
+            f"Reduce the following text to approximately {int(target_ratio * 100)}% of its original length.\n\n"
             f"Text to summarize:\n{text}"
         )
-        return self.generate(prompt, max_output_tokens=2048)
+        logger.info("[LLM] Summarizing %d characters with Gemini…", len(text))
+        response = self.summarizer.generate_content(prompt, generation_config={"max_output_tokens": 2048})
+        return (response.text or "").strip()
+
+    def summarize_map_reduce(self, text: str, target_ratio: float = 0.2,
+                             shard_chars: int = SUMMARY_SHARD_CHARS,
+                             concurrency: int = config.SUMMARY_CONCURRENCY) -> str:
+        """Like summarize(), but long text is summarized shard by shard in parallel.
+
+        Each paragraph-aligned shard is reduced to target_ratio concurrently,
+        then one more call merges the partial summaries without shortening
+        them further, so latency tracks the slowest shard, not their sum.
+        """
+        shards = _split_by_paragraphs(text, shard_chars)
+        if len(shards) <= 1:
+            return self.summarize(text, target_ratio=target_ratio)
+        logger.info("[LLM] Summarizing %d shards with up to %d concurrent calls…", len(shards), concurrency)
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(shards))) as pool:
+            partials = list(pool.map(lambda shard: self.summarize(shard, target_ratio=target_ratio), shards))
+        return self.summarize("\n\n".join(partials), target_ratio=1.0)
+
+
+def _split_by_paragraphs(text: str, max_chars: int) -> List[str]:
+    """Pack blank-line separated paragraphs into shards of at most max_chars.
+
+    A paragraph longer than max_chars is cut into max_chars pieces.
+    """
+    shards: List[str] = []
+    current = ""
+    for para in text.split("\n\n"):
+        while len(para) > max_chars:
+            if current:
+                shards.append(current)
+                current = ""
+            shards.append(para[:max_chars])
+            para = para[max_chars:]
+        if current and len(current) + 2 + len(para) > max_chars:
+            shards.append(current)
+            current = ""
+        current = f"{current}\n\n{para}" if current else para
+    if current.strip():
+        shards.append(current)
+    return shards
+
+
+@lru_cache(maxsize=None)
+def get_gemini_client(model_name: str, api_key: str) -> GeminiClient:
+    """Process-wide GeminiClient per (model, key).
+
+    Constructing a client re-runs genai.configure(), which replaces the SDK's
+    transport; sharing one keeps its connection warm across calls.
+    """
+    return GeminiClient(model_name=model_name, api_key=api_key)
+
+
+@lru_cache(maxsize=None)
+def get_embeddings_client(model_name: str, api_key: str) -> EmbeddingsClient:
+    """Process-wide EmbeddingsClient per (model, key); see get_gemini_client."""
+    return EmbeddingsClient(model_name=model_name, api_key=api_key)
 
 
 class RAGPipeline:
@@ -69,25 +160,82 @@ class RAGPipeline:
         self.store = store
         self.embedder = embedder
         self.llm = llm
+        # question embeddings don't depend on top_k; key is the normalized question
+        self._question_vecs = TTLCache(maxsize=2048, ttl=86400.0)
+
+    @staticmethod
+    def _question_key(question: str) -> str:
+        return " ".join(question.split()).lower()
+
+    def embed_questions(self, questions: List[str]) -> np.ndarray:
+        """Embed questions, calling the embedder once for those not seen recently."""
+        keys = [self._question_key(q) for q in questions]
+        vecs: List[Optional[np.ndarray]] = [self._question_vecs.get(k) for k in keys]
+        missing = [i for i, v in enumerate(vecs) if v is None]
+        if missing:
+            fresh = self.embedder.embed([questions[i] for i in missing])
+            for i, vec in zip(missing, fresh):
+                vec.flags.writeable = False
+                self._question_vecs.set(keys[i], vec)
+                vecs[i] = vec
+        if not vecs:
+            return np.zeros((0, 768), dtype=np.float32)
+        return np.vstack(vecs)
+
+    def embed_question(self, question: str) -> np.ndarray:
+        return self.embed_questions([question])[0]
 
     def build_index(self, chunks: List[Dict[str, Any]]) -> int:
         texts = [c["text"] for c in chunks]
         metas = chunks
         if not texts:
             return 0
-        print(f"[INDEX] Embedding {len(texts)} chunks…")
+        logger.info("[INDEX] Embedding %d chunks…", len(texts))
         vectors = self.embedder.embed(texts)
-        print(f"[INDEX] Adding {vectors.shape[0]} vectors to FAISS…")
+        logger.info("[INDEX] Adding %d vectors to FAISS…", vectors.shape[0])
         self.store.add(vectors, metas)
+        if self.store.apply_index_spec():
+            logger.info("[INDEX] Rebuilt index as %s over %d vectors.", self.store.index_spec, self.store.index.ntotal)
         self.store.save()
-        print("[INDEX] Saved index and metadata.")
+        logger.info("[INDEX] Saved index and metadata.")
         return vectors.shape[0]
 
-    def retrieve(self, question: str, top_k: int) -> List[Dict[str, Any]]:
-        print("[RETRIEVE] Embedding question…")
-        q_vec = self.embedder.embed([question])[0]
-        print(f"[RETRIEVE] Searching top {top_k}…")
-        hits = self.store.search(q_vec, top_k)
+    def build_index_batched(self, chunks: List[Dict[str, Any]], batch_size: int = 128) -> int:
+        """Embed and add chunks `batch_size` at a time, saving once at the end.
+
+        Each slice is embedded with batched API requests and added to FAISS as
+        one contiguous array, so only one slice of vectors is held in memory.
+        """
+        total = len(chunks)
+        if not total:
+            return 0
+        added = 0
+        for i in range(0, total, batch_size):
+            batch = chunks[i:i + batch_size]
+            logger.info("[INDEX] Embedding chunks %d-%d of %d…", i + 1, i + len(batch), total)
+            vectors = self.embedder.embed([c["text"] for c in batch])
+            self.store.add(vectors, batch)
+            added += vectors.shape[0]
+        if self.store.index_spec:
+            if self.store.apply_index_spec():
+                logger.info("[INDEX] Rebuilt index as %s over %d vectors.", self.store.index_spec, self.store.index.ntotal)
+        elif self.store.promote_to_ivf():
+            logger.info("[INDEX] Rebuilt index as IVF over %d vectors.", self.store.index.ntotal)
+        elif config.INDEX_QUANTIZATION == "sq8" and self.store.quantize_sq8():
+            logger.info("[INDEX] Quantized index to 8-bit codes (%d vectors).", self.store.index.ntotal)
+        self.store.save()
+        logger.info("[INDEX] Added %d vectors; saved index and metadata.", added)
+        return added
+
+    def retrieve(self, question: str, top_k: int, query_embedding: Optional[np.ndarray] = None,
+                 rescore_multiplier: int = 1) -> List[Dict[str, Any]]:
+        if query_embedding is None:
+            logger.debug("[RETRIEVE] Embedding question…")
+            q_vec = self.embed_question(question)
+        else:
+            q_vec = query_embedding
+        logger.debug("[RETRIEVE] Searching top %s…", top_k)
+        hits = self.store.search(q_vec, top_k, rescore_multiplier=rescore_multiplier)
         results: List[Dict[str, Any]] = []
         for score, meta in hits:
             results.append({
@@ -97,11 +245,11 @@ class RAGPipeline:
                 "page_start": int(meta.get("page_start", 0)),
                 "page_end": int(meta.get("page_end", 0)),
             })
-        print(f"[RETRIEVE] Retrieved {len(results)} chunks.")
+        logger.debug("[RETRIEVE] Retrieved %d chunks.", len(results))
         return results
 
-    def answer(self, question: str, top_k: int, max_output_tokens: int) -> Dict[str, Any]:
-        retrieved = self.retrieve(question, top_k)
+    @staticmethod
+    def _prompt(question: str, retrieved: List[Dict[str, Any]]) -> str:
         context_blocks = []
         for i, r in enumerate(retrieved, start=1):
             header = f"[Source {i}] file: {r['source_file']} pages: {r['page_start']}-{r['page_end']} (score={r['score']:.3f})"
@@ -113,7 +261,10 @@ class RAGPipeline:
             "Cite sources inline as [Source N] where N corresponds to the source block.\n\n"
             f"Question: {question}\n\nSources:\n{context_text}\n\nAnswer:"
         )
-        answer_text = self.llm.generate(prompt, max_output_tokens=max_output_tokens)
+        return prompt
+
+    @staticmethod
+    def _citations(retrieved: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         citations = []
         for i, r in enumerate(retrieved, start=1):
             citations.append({
@@ -123,4 +274,78 @@ class RAGPipeline:
                 "score": r["score"],
                 "snippet": r["text"][:500],
             })
-        return {"answer": answer_text, "citations": citations, "prompt": prompt}
+        return citations
+
+    def answer(self, question: str, top_k: int, max_output_tokens: int,
+               query_embedding: Optional[np.ndarray] = None, rescore_multiplier: int = 1) -> Dict[str, Any]:
+        retrieved = self.retrieve(question, top_k, query_embedding=query_embedding,
+                                  rescore_multiplier=rescore_multiplier)
+        prompt = self._prompt(question, retrieved)
+        answer_text = self.llm.generate(prompt, max_output_tokens=max_output_tokens)
+        return {"answer": answer_text, "citations": self._citations(retrieved), "prompt": prompt}
+
+    async def answer_stream(self, question: str, top_k: int, max_output_tokens: int,
+                            query_embedding: Optional[np.ndarray] = None,
+                            rescore_multiplier: int = 1) -> AsyncIterator[Dict[str, Any]]:
+        """Like answer(), but yield {"token": text} events as Gemini streams them.
+
+        The last event is {"citations": [...], "prompt": ...}. Retrieval and
+        each blocking read from the Gemini stream run in a worker thread so
+        the event loop keeps serving other requests meanwhile.
+        """
+        retrieved = await asyncio.to_thread(self.retrieve, question, top_k, query_embedding, rescore_multiplier)
+        prompt = self._prompt(question, retrieved)
+        tokens = self.llm.generate_stream(prompt, max_output_tokens)
+        while True:
+            token = await asyncio.to_thread(next, tokens, None)
+            if token is None:
+                break
+            yield {"token": token}
+        yield {"citations": self._citations(retrieved), "prompt": prompt}
+
+    def answer_batch(self, requests: List[Tuple[str, int, int, int]],
+                     query_embeddings: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Answer (question, top_k, max_output_tokens, rescore_multiplier) tuples,
+        embedding all questions in one call.
+
+        Pass `query_embeddings` (one row per request) if the questions are
+        already embedded. Answers are generated concurrently, at most
+        config.ANSWER_CONCURRENCY Gemini calls at once. A failure while
+        answering one question is reported as {"error": ...} in its slot
+        instead of failing the whole batch.
+        """
+        if not requests:
+            return []
+        q_vecs = query_embeddings
+        if q_vecs is None:
+            q_vecs = self.embed_questions([question for question, _, _, _ in requests])
+
+        def _answer(request: Tuple[str, int, int, int], q_vec: np.ndarray) -> Dict[str, Any]:
+            question, top_k, max_output_tokens, rescore_multiplier = request
+            try:
+                return self.answer(question, top_k, max_output_tokens, query_embedding=q_vec,
+                                   rescore_multiplier=rescore_multiplier)
+            except Exception as e:
+                return {"error": str(e)}
+
+        if len(requests) == 1:
+            return [_answer(requests[0], q_vecs[0])]
+        with ThreadPoolExecutor(max_workers=min(len(requests), config.ANSWER_CONCURRENCY)) as pool:
+            return list(pool.map(_answer, requests, q_vecs))
+
+
+class EmbeddingBatcher(MicroBatcher):
+    """
+    Coalesces question embeddings requested by concurrent queries into a
+    single embedder call, made in a worker thread (see MicroBatcher).
+    """
+
+    def __init__(self, embed: Callable[[List[str]], np.ndarray], max_batch: int = 32, window: float = 0.010):
+        super().__init__(self._embed_batch, max_batch=max_batch, window=window)
+        self._embed = embed
+
+    async def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self._embed, texts)
+
+    async def embed(self, text: str) -> np.ndarray:
+        return await self.submit(text)
@@ -4,6 +4,7 @@ from typing import List, Optional, Any
 
 class IngestRequest(BaseModel):
     force_rebuild: bool = Field(False, description="If true, re-create the index from scratch")
+    files: Optional[List[str]] = Field(None, description="PDF file names to ingest; all PDFs when omitted")
 
 
 class IngestResponse(BaseModel):
@@ -17,6 +18,7 @@ class QueryRequest(BaseModel):
     question: str
     top_k: Optional[int] = None
     max_output_tokens: Optional[int] = 512
+    dialogue_id: Optional[str] = Field(None, description="Conversation id; follow-up turns stick to the same server")
 
 
 class Citation(BaseModel):
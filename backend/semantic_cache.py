@@ -0,0 +1,92 @@
+"""
+Semantic answer cache: reuse an answer when a new question embeds close
+enough to one already answered.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+import faiss
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Question embeddings in a FAISS inner-product index (vectors are L2
+    normalized, so scores are cosine similarities) next to their answers.
+
+    A lookup hits when the nearest cached question scores at least
+    `threshold`, was answered with the same `params` (e.g. top_k) and is
+    younger than `ttl` seconds. Beyond `maxsize` entries the least recently
+    used one is evicted. Operations never await, so a single asyncio event
+    loop can use it without a lock.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl: float = 3600.0, maxsize: int = 10_000, probe: int = 4):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.probe = probe
+        self.index: Optional[faiss.IndexIDMap2] = None
+        self._entries: "OrderedDict[int, Tuple[float, Hashable, Any]]" = OrderedDict()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vec: np.ndarray) -> np.ndarray:
+        q = np.ascontiguousarray(vec, dtype=np.float32).reshape(1, -1).copy()
+        faiss.normalize_L2(q)
+        return q
+
+    def get(self, embedding: np.ndarray, params: Hashable = None) -> Any:
+        if self.index is None or self.index.ntotal == 0:
+            self.misses += 1
+            return None
+        scores, ids = self.index.search(self._normalize(embedding), min(self.probe, self.index.ntotal))
+        now = time.monotonic()
+        for score, idx in zip(scores[0].tolist(), ids[0].tolist()):
+            if idx == -1 or score < self.threshold:
+                break
+            expires, entry_params, value = self._entries[idx]
+            if expires <= now:
+                self._remove(idx)
+                continue
+            if entry_params == params:
+                self._entries.move_to_end(idx)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, embedding: np.ndarray, value: Any, params: Hashable = None) -> None:
+        q = self._normalize(embedding)
+        if self.index is None:
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(q.shape[1]))
+        idx = self._next_id
+        self._next_id += 1
+        self.index.add_with_ids(q, np.array([idx], dtype=np.int64))
+        self._entries[idx] = (time.monotonic() + self.ttl, params, value)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, idx: int) -> None:
+        self._entries.pop(idx, None)
+        self.index.remove_ids(np.array([idx], dtype=np.int64))
+
+    def clear(self) -> None:
+        self.index = None
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -39,7 +39,7 @@
 #         try:
 #             logger.info("Initializing Server 1 RAG pipeline...")
 #             embedder = EmbeddingsClient(model_name="models/embedding-001", api_key=config.GOOGLE_API_KEY)
-#             llm = GeminiClient(model_name="gemini-1.5-flash", api_key=config.GOOGLE_API_KEY)
+#             llm = GeminiClient(model_name=LLM_MODEL, api_key=config.GOOGLE_API_KEY)
 #             _store = FaissStore(INDEX_PATH, META_PATH)
 #             _store.load()
 #             _rag = RAGPipeline(_store, embedder, llm)
@@ -159,15 +159,23 @@ import logging
 import os
 import time
 import asyncio
+import hashlib
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 
+import orjson
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 # Import your existing backend modules (unchanged)
 from backend import ingest, config
-from backend.rag import EmbeddingsClient, GeminiClient, RAGPipeline
+from backend.cache import TTLCache, read_text_cached, write_text
+from backend.rag import RAGPipeline, get_embeddings_client, get_gemini_client
+from backend.semantic_cache import SemanticCache
 from backend.vectorstore import FaissStore
 from backend.schemas import StatsResponse, HealthResponse
 
@@ -176,7 +184,11 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("server1")
 
 # --- App setup ---
-app = FastAPI(title="Server 1 - Ingestion + L1 Summary", version="1.0.0")
+app = FastAPI(
+    title="Server 1 - Ingestion + L1 Summary",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 origins = [
     "http://localhost:3000",
@@ -194,15 +206,33 @@ app.add_middleware(
 RAW_DIR = os.path.join(config.PDFS_DIR, "raw")
 L1_DIR = os.path.join(config.PDFS_DIR, "summaries", "L1")
 os.makedirs(L1_DIR, exist_ok=True)
+L1_SUMMARY_PATH = os.path.join(L1_DIR, "summary_L1.txt")
+L1_META_PATH = os.path.join(L1_DIR, "summary_L1.meta.json")
+# L1 summaries are map-reduced: documents are summarized at the requested ratio
+# (at most config.SUMMARY_CONCURRENCY Gemini calls at once), then merged at REDUCE_RATIO
+REDUCE_RATIO = 0.5
 
 INDEX_PATH = "server1_index.faiss"
 META_PATH = "server1_meta.json"
 
 # --- Global lazy state (protected with lock) ---
-_initialized = False
 _store: Optional[FaissStore] = None
 _rag: Optional[RAGPipeline] = None
 _init_lock = asyncio.Lock()
+# Serializes /ingest; the store itself is guarded by FaissStore.lock
+_ingest_lock = asyncio.Lock()
+
+# Answers for byte-identical requests (checked first, no embedding needed),
+# then answers reused for paraphrased questions (cosine >= 0.92). Both are
+# cleared on ingest.
+LLM_MODEL = "gemini-1.5-flash"
+_exact_cache = TTLCache(maxsize=10_000, ttl=3600.0)
+_answer_cache = SemanticCache(threshold=0.92, ttl=3600.0, maxsize=10_000)
+
+
+def _exact_key(request: "QueryRequest") -> str:
+    payload = {"q": request.question, "k": request.top_k, "t": request.max_output_tokens, "model": LLM_MODEL}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
 
 
 # Pydantic model used for incoming queries
@@ -223,6 +253,11 @@ async def _create_store_if_missing(index_path: str, meta_path: str) -> FaissStor
         # but guard here in case it raises.
         store.load()
         logger.info("FaissStore loaded from disk.")
+        try:
+            if store.to_gpu():
+                logger.info("FAISS index moved to GPU 0.")
+        except Exception as exc:
+            logger.warning("Keeping FAISS index on CPU (GPU transfer failed): %s", exc)
     except FileNotFoundError:
         logger.info("Index or metadata not found on disk. Creating a fresh store.")
         # Ensure any internal initialization happens (depends on FaissStore impl)
@@ -246,38 +281,37 @@ async def get_rag_pipeline() -> RAGPipeline:
     Lazy, thread-safe initialization of the RAG pipeline components.
     Returns a ready-to-use RAGPipeline or raises HTTPException on hard failure.
     """
-    global _initialized, _store, _rag
+    global _store, _rag
 
-    # Fast path
-    if _initialized and _rag is not None:
-        return _rag
+    # Fast path: a single global read, no lock once the pipeline exists
+    rag = _rag
+    if rag is not None:
+        return rag
 
     async with _init_lock:
         # Double-check after acquiring lock
-        if _initialized and _rag is not None:
+        if _rag is not None:
             return _rag
 
         try:
             logger.info("Initializing Server 1 RAG pipeline...")
             # Initialize embedder & llm clients (these constructors may raise)
-            embedder = EmbeddingsClient(model_name="models/embedding-001", api_key=config.GOOGLE_API_KEY)
-            llm = GeminiClient(model_name="gemini-1.5-flash", api_key=config.GOOGLE_API_KEY)
+            embedder = get_embeddings_client("models/embedding-001", config.GOOGLE_API_KEY)
+            llm = get_gemini_client(LLM_MODEL, config.GOOGLE_API_KEY)
 
             # Create/load vector store safely
             _store = await _create_store_if_missing(INDEX_PATH, META_PATH)
 
-            # Build RAG pipeline (assumes RAGPipeline(store, embedder, llm))
-            _rag = RAGPipeline(_store, embedder, llm)
-
-            # Mark initialized only after all steps succeed
-            _initialized = True
+            # Build RAG pipeline (assumes RAGPipeline(store, embedder, llm)) and
+            # publish it last, so the fast path never sees a partial pipeline
+            rag = RAGPipeline(_store, embedder, llm)
+            _rag = rag
             logger.info("RAG pipeline initialized successfully.")
-            return _rag
+            return rag
 
         except Exception as exc:
             logger.exception("RAG initialization failed: %s", exc)
-            # Make sure partial state doesn't remain marked initialized
-            _initialized = False
+            # Make sure partial state doesn't remain published
             _rag = None
             _store = None
             # Surface helpful error to client/orchestrator
@@ -354,11 +388,122 @@ async def stats():
 # -----------------------
 # Ingestion endpoint
 # -----------------------
+async def _parse_pdfs(paths: List[str]) -> List[Dict[str, Any]]:
+    """Parse PDFs in worker threads (bounded by CPU count); chunks keep file order."""
+    sem = asyncio.Semaphore(os.cpu_count() or 4)
+
+    async def _one(path: str) -> List[Dict[str, Any]]:
+        async with sem:
+            return await asyncio.to_thread(ingest.parse_one_pdf, path)
+
+    logger.info("Parsing %d PDF files...", len(paths))
+    results = await asyncio.gather(*(_one(p) for p in paths))
+    return list(itertools.chain.from_iterable(results))
+
+
+def _corpus_hash(chunks: List[Dict[str, Any]], target_ratio: float) -> str:
+    """Order-independent hash of the chunk texts (plus the ratio) an L1 summary was made from."""
+    digests = sorted(hashlib.sha256(c.get("text", "").encode("utf-8")).digest() for c in chunks)
+    h = hashlib.sha256(b"".join(digests))
+    h.update(repr(target_ratio).encode("ascii"))
+    return h.hexdigest()
+
+
+def _cached_l1_summary(corpus_hash: str) -> Optional[str]:
+    """The saved L1 summary if it was generated from the same corpus, else None."""
+    try:
+        with open(L1_META_PATH, "r", encoding="utf-8") as f:
+            if json.load(f).get("corpus_hash") != corpus_hash:
+                return None
+        return read_text_cached(L1_SUMMARY_PATH)
+    except (OSError, ValueError):
+        return None
+
+
+def _indexed_chunks(store: FaissStore) -> List[Dict[str, Any]]:
+    """Metadata of every indexed chunk (blocking: waits for the store's lock)."""
+    with store.lock:
+        return list(store.id_to_meta.values())
+
+
+def _index_chunks(rag_pipeline: RAGPipeline, chunks: List[Dict[str, Any]]) -> int:
+    """Embed, add and save `chunks` (blocking); failures surface as a 500."""
+    try:
+        vectors_added = rag_pipeline.build_index_batched(chunks, batch_size=128)
+    except Exception as e:
+        logger.exception("Failed to build index: %s", e)
+        raise HTTPException(status_code=500, detail=f"Index build failed: {e}")
+    logger.info("Vectors added to index: %s", vectors_added)
+    return vectors_added
+
+
+def _map_reduce_summary(chunks: List[Dict[str, Any]], target_ratio: float) -> str:
+    """Summarize each source file in parallel, then summarize the concatenated summaries.
+
+    Each Gemini call only sees one document (or the much shorter partial
+    summaries), so the prompt stays within the model's context however large
+    the corpus grows.
+    """
+    docs: Dict[str, List[str]] = {}
+    for c in chunks:
+        docs.setdefault(c.get("source_file", ""), []).append(c.get("text", ""))
+    texts = ["\n".join(parts) for parts in docs.values()]
+    if len(texts) <= 1:
+        return ingest.summarize_text(texts[0] if texts else "", target_ratio=target_ratio, api_key=config.GOOGLE_API_KEY)
+
+    def _summarize(text: str) -> str:
+        return ingest.summarize_text(text, target_ratio=target_ratio, api_key=config.GOOGLE_API_KEY)
+
+    with ThreadPoolExecutor(max_workers=config.SUMMARY_CONCURRENCY) as pool:
+        partials = list(pool.map(_summarize, texts))
+    logger.info("Merging %d per-document summaries into the L1 summary...", len(partials))
+    return ingest.summarize_text("\n\n".join(partials), target_ratio=REDUCE_RATIO, api_key=config.GOOGLE_API_KEY)
+
+
+def _write_l1_summary(summary_chunks: List[Dict[str, Any]], target_ratio: float):
+    """Create (or reuse) the L1 summary and save it (blocking).
+
+    Returns (summary, path), with path None if the file couldn't be written.
+    """
+    summary_chunks = [c for c in summary_chunks if isinstance(c, dict)]
+    corpus_hash = _corpus_hash(summary_chunks, target_ratio)
+    summary = _cached_l1_summary(corpus_hash)
+    if summary is not None:
+        logger.info("Corpus unchanged since the last L1 summary; reusing it.")
+        return summary, L1_SUMMARY_PATH
+
+    full_text = "\n".join(c.get("text", "") for c in summary_chunks)
+    generated = False
+    try:
+        summary = _map_reduce_summary(summary_chunks, target_ratio)
+        if not isinstance(summary, str):
+            summary = str(summary)
+        generated = True
+    except Exception as e:
+        logger.exception("Summarization failed: %s", e)
+        # Fallback: produce a simple extractive short summary
+        logger.info("Falling back to extractive summary (first 1000 chars).")
+        summary = (full_text[:1000] + "...") if full_text else ""
+
+    # Save summary to disk; the hash is only recorded for a real summary,
+    # so a fallback is regenerated on the next ingest
+    try:
+        summary_path = write_text(L1_SUMMARY_PATH, summary)
+        with open(L1_META_PATH, "w", encoding="utf-8") as f:
+            json.dump({"corpus_hash": corpus_hash if generated else None}, f)
+    except Exception as e:
+        logger.exception("Failed to write summary file: %s", e)
+        return summary, None  # indicate not saved
+    return summary, summary_path
+
+
 @app.post("/ingest")
 async def ingest_and_summarize(request: Request):
     """
     Ingest PDFs from RAW_DIR, build index and create L1 summary.
-    Accepts an optional JSON body with {"target_ratio": float} to control summary ratio.
+    Accepts an optional JSON body with {"target_ratio": float} to control summary ratio
+    and {"files": [names]} to add only those PDFs to the index; the L1 summary is then
+    rebuilt from everything indexed so far.
     """
     start_time = time.time()
     try:
@@ -373,10 +518,13 @@ async def ingest_and_summarize(request: Request):
             body = {}
 
         target_ratio = float(body.get("target_ratio", 0.1))
+        files = body.get("files")
+        if files is not None and not isinstance(files, list):
+            raise HTTPException(status_code=422, detail="'files' must be a list of file names")
 
-        # Extract chunks from PDFs (ingest.ingest_pdfs should return list of chunks with 'text')
+        # Extract chunks from PDFs, several files at a time off the event loop
         try:
-            chunks = ingest.ingest_pdfs(RAW_DIR)
+            chunks = await _parse_pdfs(ingest.list_pdf_files(RAW_DIR, files=files))
         except FileNotFoundError as e:
             logger.warning("Raw PDF directory not found or empty: %s", e)
             chunks = []
@@ -389,6 +537,7 @@ async def ingest_and_summarize(request: Request):
             logger.info("No documents found during ingestion.")
             return {
                 "status": "ok",
+                "files_processed": 0,
                 "chunks": 0,
                 "vectors_added": 0,
                 "summary_file": None,
@@ -397,51 +546,37 @@ async def ingest_and_summarize(request: Request):
                 "note": "No documents found to ingest."
             }
 
-        # Build RAG index
-        rag_pipeline = await get_rag_pipeline()
-        try:
-            vectors_added = rag_pipeline.build_index(chunks)
-            logger.info("Vectors added to index: %s", vectors_added)
-        except Exception as e:
-            logger.exception("Failed to build index: %s", e)
-            raise HTTPException(status_code=500, detail=f"Index build failed: {e}")
-
-        # Save index if anything changed (store.save may raise)
-        try:
-            if hasattr(rag_pipeline.store, "save"):
-                rag_pipeline.store.save()
-                logger.info("Index saved to disk.")
-        except Exception as e:
-            # Non-fatal: log and continue, but inform caller
-            logger.warning("Failed to save index to disk: %s", e)
-
-        # Create L1 summary (wrap the summarizer)
-        full_text = "\n".join(c.get("text", "") for c in chunks if isinstance(c, dict))
-        try:
-            summary = ingest.summarize_text(full_text, target_ratio=target_ratio, api_key=config.GOOGLE_API_KEY)
-            if not isinstance(summary, str):
-                summary = str(summary)
-        except Exception as e:
-            logger.exception("Summarization failed: %s", e)
-            # Fallback: produce a simple extractive short summary
-            logger.info("Falling back to extractive summary (first 1000 chars).")
-            summary = (full_text[:1000] + "...") if full_text else ""
+        files_processed = len({c.get("source_file") for c in chunks})
+        unique = ingest.dedupe_chunks(chunks)
+        dedup_dropped = len(chunks) - len(unique)
+        logger.info("Dropped %d duplicate chunks before embedding", dedup_dropped)
+        chunks = unique
 
-        # Save summary to disk
-        out_path = os.path.join(L1_DIR, "summary_L1.txt")
-        try:
-            with open(out_path, "w", encoding="utf-8") as f:
-                f.write(summary)
-        except Exception as e:
-            logger.exception("Failed to write summary file: %s", e)
-            out_path = None  # indicate not saved
+        # Index the new chunks and write the L1 summary concurrently; a partial
+        # ingest summarizes everything already indexed plus the new chunks.
+        # One ingest at a time: each reads the corpus the previous one wrote.
+        rag_pipeline = await get_rag_pipeline()
+        async with _ingest_lock:
+            if files is not None:
+                summary_chunks = await asyncio.to_thread(_indexed_chunks, rag_pipeline.store) + chunks
+            else:
+                summary_chunks = chunks
+            vectors_added, (summary, out_path) = await asyncio.gather(
+                asyncio.to_thread(_index_chunks, rag_pipeline, chunks),
+                asyncio.to_thread(_write_l1_summary, summary_chunks, target_ratio),
+            )
+            # answers may cite a corpus that just changed
+            _exact_cache.clear()
+            _answer_cache.clear()
 
         processing_time = time.time() - start_time
         logger.info("Ingestion completed in %.2f seconds", processing_time)
 
         return {
             "status": "ok",
+            "files_processed": files_processed,
             "chunks": len(chunks),
+            "dedup_dropped": dedup_dropped,
             "vectors_added": vectors_added,
             "summary_file": out_path,
             "processing_time": processing_time,
@@ -455,25 +590,89 @@ async def ingest_and_summarize(request: Request):
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {e}")
 
 
+@app.post("/compact")
+async def compact_index():
+    """Fold the index's delta log into a full rewrite of the index and metadata files."""
+    rag_pipeline = await get_rag_pipeline()
+    try:
+        await asyncio.to_thread(rag_pipeline.store.compact)
+    except Exception as e:
+        logger.exception("Index compaction failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"Compaction failed: {e}")
+    return {"status": "ok", "vectors": int(rag_pipeline.store.index.ntotal) if rag_pipeline.store.index is not None else 0}
+
+
 # -----------------------
 # Query endpoints
 # -----------------------
+def _sse(event: Dict[str, Any]) -> bytes:
+    return b"data: " + orjson.dumps(event) + b"\n\n"
+
+
+async def _replay_sse(result: Dict[str, Any]):
+    """Send a cached answer in the same event shape as a live stream."""
+    yield _sse({"token": result.get("answer", "")})
+    yield _sse({"citations": result.get("citations", []), "prompt": result.get("prompt", "")})
+
+
+async def _stream_sse(rag_pipeline: RAGPipeline, request: QueryRequest, key: str, q_vec):
+    """Relay answer_stream() as server-sent events, caching the full answer once it completes."""
+    tokens: List[str] = []
+    try:
+        async for event in rag_pipeline.answer_stream(
+            request.question, request.top_k, request.max_output_tokens, query_embedding=q_vec
+        ):
+            if "token" in event:
+                tokens.append(event["token"])
+            else:
+                result = {"answer": "".join(tokens).strip(), **event}
+                _answer_cache.set(q_vec, result, (request.top_k, request.max_output_tokens))
+                _exact_cache.set(key, result)
+            yield _sse(event)
+    except Exception as e:
+        logger.exception("Streaming query failed: %s", e)
+        yield _sse({"error": f"Query failed: {e}"})
+
+
 @app.post("/query")
-async def query_server1(request: QueryRequest):
+async def query_server1(request: QueryRequest, stream: bool = False):
     """
     Query the full document index.
     Returns whatever rag_pipeline.answer() returns (must be JSON-serializable).
+    With ?stream=1 the answer is sent as text/event-stream instead: one
+    {"token": ...} event per generated piece, then {"citations", "prompt"}.
     """
     try:
+        key = _exact_key(request)
+        cached = _exact_cache.get(key)
+        if cached is not None:
+            if stream:
+                return StreamingResponse(_replay_sse(cached), media_type="text/event-stream")
+            return cached
         rag_pipeline = await get_rag_pipeline()
-        result = rag_pipeline.answer(
+        params = (request.top_k, request.max_output_tokens)
+        # embedding, retrieval and Gemini calls block; keep them off the event loop
+        q_vec = await asyncio.to_thread(rag_pipeline.embed_question, request.question)
+        cached = _answer_cache.get(q_vec, params)
+        if cached is not None:
+            _exact_cache.set(key, cached)
+            if stream:
+                return StreamingResponse(_replay_sse(cached), media_type="text/event-stream")
+            return cached
+        if stream:
+            return StreamingResponse(_stream_sse(rag_pipeline, request, key, q_vec), media_type="text/event-stream")
+        result = await asyncio.to_thread(
+            rag_pipeline.answer,
             request.question,
             top_k=request.top_k,
-            max_output_tokens=request.max_output_tokens
+            max_output_tokens=request.max_output_tokens,
+            query_embedding=q_vec,
         )
         # Ensure JSON serializable; if not, coerce
         if not isinstance(result, (dict, list, str, int, float, type(None))):
             result = {"result": str(result)}
+        _answer_cache.set(q_vec, result, params)
+        _exact_cache.set(key, result)
         return result
     except HTTPException:
         raise
@@ -490,3 +689,53 @@ async def query_server1_legacy(question: str):
     """
     req = QueryRequest(question=question)
     return await query_server1(req)
+
+
+@app.post("/query_batch")
+async def query_server1_batch(requests: List[QueryRequest]):
+    """
+    Answer several queries in one round-trip (used by the MCP client's micro-batcher).
+    Questions are embedded together; results come back in request order.
+    """
+    try:
+        keys = [_exact_key(r) for r in requests]
+        results: List[Any] = [_exact_cache.get(k) for k in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        rag_pipeline = await get_rag_pipeline()
+        q_vecs = await asyncio.to_thread(rag_pipeline.embed_questions, [requests[i].question for i in pending])
+        misses: List[int] = []
+        for i, q_vec in zip(pending, q_vecs):
+            r = requests[i]
+            results[i] = _answer_cache.get(q_vec, (r.top_k, r.max_output_tokens))
+            if results[i] is None:
+                misses.append(i)
+            else:
+                _exact_cache.set(keys[i], results[i])
+        if misses:
+            rows = [pending.index(i) for i in misses]
+            answered = await asyncio.to_thread(
+                rag_pipeline.answer_batch,
+                [(requests[i].question, requests[i].top_k, requests[i].max_output_tokens, 1) for i in misses],
+                query_embeddings=q_vecs[rows],
+            )
+            for i, row, result in zip(misses, rows, answered):
+                results[i] = result
+                if "error" not in result:
+                    r = requests[i]
+                    _answer_cache.set(q_vecs[row], result, (r.top_k, r.max_output_tokens))
+                    _exact_cache.set(keys[i], result)
+        return results
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Batch query failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"Batch query failed: {e}")
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the exact and semantic answer caches."""
+    return {"exact": _exact_cache.stats(), "semantic": _answer_cache.stats()}
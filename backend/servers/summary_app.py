@@ -0,0 +1,291 @@
+"""
+FastAPI app shared by the summary servers.
+
+Server N (2 or 3) reads the level N-1 summary, condenses it into the level N
+summary, indexes that in its own FAISS store and answers queries against it.
+server2.py and server3.py only pick the level and its parameters.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+
+import orjson
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from backend import config
+from backend.cache import read_text_cached, write_text
+from backend.rag import EmbeddingBatcher, RAGPipeline, get_embeddings_client, get_gemini_client
+from backend.vectorstore import FaissStore
+from backend.schemas import StatsResponse, HealthResponse
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUMMARIES_DIR = os.path.join(config.PDFS_DIR, "summaries")
+# /query candidates fetched per result from the quantized index, then re-ranked exactly
+RESCORE_MULTIPLIER = 4
+
+# DEFINE YOUR ALLOWED ORIGINS
+origins = [
+    "http://localhost:3000",
+    # You might want to add your production frontend URL here as well
+    # e.g., "https://your-app-name.vercel.app"
+]
+
+
+def _sse(event: Dict[str, Any]) -> bytes:
+    return b"data: " + orjson.dumps(event) + b"\n\n"
+
+
+def make_app(level: int, ratio: float, top_k: int, max_output_tokens: int, title: str,
+             index_spec: Optional[str] = None) -> FastAPI:
+    """Build the server for summary level `level` (L{level-1} -> L{level}).
+
+    `ratio` is the target length of the new summary relative to its input;
+    `top_k` and `max_output_tokens` are the /query defaults; `index_spec` is
+    the faiss.index_factory string the level's index is built as.
+    """
+    prev = level - 1
+    name = f"Server {level}"
+    out_dir = os.path.join(SUMMARIES_DIR, f"L{level}")
+    os.makedirs(out_dir, exist_ok=True)
+    in_file = os.path.join(SUMMARIES_DIR, f"L{prev}", f"summary_L{prev}.txt")
+    out_name = f"summary_L{level}.txt"
+    out_file = os.path.join(out_dir, out_name)
+    index_path = f"server{level}_index.faiss"
+    meta_path = f"server{level}_meta.json"
+
+    # Built once at startup (see lifespan); handlers only read it
+    rag: Optional[RAGPipeline] = None
+    # One summarize at a time; queries racing it are kept safe by FaissStore.lock
+    summarize_lock = asyncio.Lock()
+
+    default_top_k, default_max_output_tokens = top_k, max_output_tokens
+
+    class QueryRequest(BaseModel):
+        question: str
+        top_k: Optional[int] = default_top_k
+        max_output_tokens: Optional[int] = default_max_output_tokens
+        rescore_multiplier: int = RESCORE_MULTIPLIER
+
+    def build_pipeline() -> RAGPipeline:
+        """Construct the store and pipeline (blocking: loads the FAISS index)."""
+        logger.info("Initializing %s RAG pipeline...", name)
+        # process-wide clients, shared with any other level served from this process
+        embedder = get_embeddings_client("models/embedding-001", config.GOOGLE_API_KEY)
+        llm = get_gemini_client("gemini-1.5-flash", config.GOOGLE_API_KEY)
+        store = FaissStore(
+            index_path, meta_path,
+            index_spec=index_spec or None, nprobe=config.SUMMARY_INDEX_NPROBE,
+            # float32 copies for rescoring only pay off over compressed codes
+            keep_fp32=bool(index_spec) and ("SQ" in index_spec or "PQ" in index_spec),
+        )
+        store.load()
+        pipeline = RAGPipeline(store, embedder, llm)
+        logger.info("%s RAG pipeline initialized successfully", name)
+        return pipeline
+
+    def get_rag_pipeline() -> RAGPipeline:
+        """The pipeline built at startup; 503 until it is ready."""
+        if rag is None:
+            raise HTTPException(status_code=503, detail="RAG pipeline is not initialized yet")
+        return rag
+
+    # Questions from concurrent /query calls are embedded together (see EmbeddingBatcher)
+    embed_batcher = EmbeddingBatcher(lambda texts: get_rag_pipeline().embed_questions(texts))
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        nonlocal rag
+        # a failure here aborts startup instead of surfacing on the first request
+        rag = await run_in_threadpool(build_pipeline)
+        embed_batcher.start()
+        try:
+            yield
+        finally:
+            await embed_batcher.stop()
+
+    app = FastAPI(
+        title=title,
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"], # Allows all methods
+        allow_headers=["*"], # Allows all headers
+    )
+
+    @app.get("/health", response_model=HealthResponse)
+    async def health():
+        """Health check endpoint"""
+        try:
+            rag_pipeline = get_rag_pipeline()
+            stats = rag_pipeline.store.stats()
+            return HealthResponse(
+                status="ok",
+                stats=StatsResponse(**stats)
+            )
+        except Exception as e:
+            logger.error("Health check failed: %s", e)
+            return HealthResponse(
+                status="error",
+                stats=StatsResponse(
+                    vectors=0,
+                    files_indexed=0,
+                    index_path="",
+                    metadata_path="",
+                    index_exists=False
+                )
+            )
+
+    @app.get("/stats", response_model=StatsResponse)
+    async def stats():
+        """Get server statistics"""
+        try:
+            rag_pipeline = get_rag_pipeline()
+            return StatsResponse(**rag_pipeline.store.stats())
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("Stats retrieval failed: %s", e)
+            raise HTTPException(status_code=500, detail=str(e))
+
+    def do_summarize() -> Dict[str, Any]:
+        """Blocking half of the summarize endpoint: read, summarize with Gemini, write and index."""
+        logger.info("Starting L%d to L%d summarization...", prev, level)
+        start_time = time.time()
+
+        try:
+            in_text = read_text_cached(in_file)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"No L{prev} summary found. Run Server{prev} first.")
+
+        logger.info("L%d text length: %d characters", prev, len(in_text))
+
+        rag_pipeline = get_rag_pipeline()
+
+        summary = rag_pipeline.llm.summarize_map_reduce(in_text, target_ratio=ratio)
+        logger.info("L%d summary length: %d characters", level, len(summary))
+
+        # Save summary text file
+        out_path = write_text(out_file, summary)
+
+        # Index the newly created summary
+        logger.info("Indexing the L%d summary...", level)
+        summary_chunks = [{
+            "text": summary,
+            "metadata": {"source": out_name}
+        }]
+        vectors_added = rag_pipeline.build_index(summary_chunks)
+        rag_pipeline.store.save()
+        logger.info("Added %d vectors to %s index. Index saved.", vectors_added, name)
+
+        processing_time = time.time() - start_time
+        logger.info("L%d summarization completed in %.2f seconds", level, processing_time)
+
+        return {
+            "status": "ok",
+            "summary_file": out_path,
+            "vectors_added": vectors_added,
+            "processing_time": processing_time,
+            f"l{prev}_length": len(in_text),
+            f"l{level}_length": len(summary),
+            "compression_ratio": len(summary) / len(in_text) if in_text else 0
+        }
+
+    @app.post(
+        f"/summarize_l{prev}",
+        description=f"Takes the L{prev} summary → produces the L{level} summary (~{ratio:.0%} of L{prev}) and indexes it.",
+    )
+    async def summarize():
+        try:
+            async with summarize_lock:
+                # Gemini, disk and FAISS work all block; keep them off the event loop
+                return await run_in_threadpool(do_summarize)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("L%d summarization failed: %s", level, e)
+            raise HTTPException(status_code=500, detail=f"L{level} summarization failed: {str(e)}")
+
+    async def answer_impl(question: str, top_k: int, max_output_tokens: int,
+                          rescore_multiplier: int = RESCORE_MULTIPLIER) -> Dict[str, Any]:
+        """Shared body of /query and the legacy path route."""
+        try:
+            rag_pipeline = get_rag_pipeline()
+            q_vec = await embed_batcher.embed(question)
+            # retrieval and the Gemini call block; keep them off the event loop
+            return await run_in_threadpool(
+                rag_pipeline.answer,
+                question,
+                top_k=top_k,
+                max_output_tokens=max_output_tokens,
+                query_embedding=q_vec,
+                rescore_multiplier=rescore_multiplier,
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("Query failed: %s", e)
+            raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+
+    @app.post("/query", description=f"Query the L{level} summary index")
+    async def query(request: QueryRequest):
+        return await answer_impl(
+            request.question, request.top_k, request.max_output_tokens, request.rescore_multiplier
+        )
+
+    async def stream_events(rag_pipeline: RAGPipeline, request: QueryRequest, q_vec):
+        try:
+            async for event in rag_pipeline.answer_stream(
+                request.question, request.top_k, request.max_output_tokens,
+                query_embedding=q_vec, rescore_multiplier=request.rescore_multiplier,
+            ):
+                yield _sse(event)
+        except Exception as e:
+            logger.exception("Streaming query failed: %s", e)
+            yield _sse({"error": f"Query failed: {e}"})
+
+    @app.post("/query/stream")
+    async def query_stream(request: QueryRequest):
+        """
+        Like /query, but the answer is sent as text/event-stream while Gemini
+        generates it: one {"token": ...} event per piece, then {"citations", "prompt"}.
+        """
+        rag_pipeline = get_rag_pipeline()
+        q_vec = await embed_batcher.embed(request.question)
+        return StreamingResponse(stream_events(rag_pipeline, request, q_vec), media_type="text/event-stream")
+
+    @app.post("/query_batch")
+    async def query_batch(requests: List[QueryRequest]):
+        """Answer several queries in one round-trip, embedding the questions together"""
+        try:
+            rag_pipeline = get_rag_pipeline()
+            return await run_in_threadpool(
+                rag_pipeline.answer_batch,
+                [(r.question, r.top_k, r.max_output_tokens, r.rescore_multiplier) for r in requests],
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("Batch query failed: %s", e)
+            raise HTTPException(status_code=500, detail=f"Batch query failed: {str(e)}")
+
+    @app.post("/query/{question}")
+    async def query_legacy(question: str):
+        """Legacy query endpoint for backward compatibility"""
+        return await answer_impl(question, top_k, max_output_tokens)
+
+    return app
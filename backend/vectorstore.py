@@ -1,67 +1,409 @@
+import functools
 import json
+import logging
+import math
 import os
-from typing import List, Dict, Any, Tuple
+import threading
+import time
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
 
 import faiss
 import numpy as np
 
 from backend import config
 
+logger = logging.getLogger(__name__)
+
+# Past this many vectors a flat index is rebuilt as IVF-PQ (see promote_to_ivf)
+IVF_THRESHOLD = 50_000
+IVF_NPROBE = 16
+IVF_PQ_M = 16
+IVF_TRAIN_SAMPLE = 100_000
+SQ_TRAIN_SAMPLE = 50_000
+# Graph build/search breadth for HNSW specs (see apply_index_spec)
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = 32
+# save() appends new vectors to a delta log until it holds this fraction of the index
+DELTA_COMPACT_RATIO = 0.10
+# stats() is recomputed at most this often (seconds) unless the store changes
+STATS_TTL = 5.0
+
+
+def _locked(method):
+    """Run `method` holding the store's lock (see FaissStore.lock)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class FaissStore:
-    def __init__(self, index_path: str, metadata_path: str):
+    def __init__(self, index_path: str, metadata_path: str,
+                 index_spec: Optional[str] = None, nprobe: int = IVF_NPROBE, keep_fp32: bool = False):
         self.index_path = index_path
         self.metadata_path = metadata_path
-        self.index: faiss.IndexFlatIP | None = None
+        # faiss.index_factory string the flat index is rebuilt as (see apply_index_spec)
+        self.index_spec = index_spec
+        self.nprobe = nprobe
+        # Exact float32 copies of the vectors (row = id), so search() can
+        # rescore candidates from a quantized index. Written when the index is
+        # first quantized, then appended on save; a flat index needs none.
+        self.keep_fp32 = keep_fp32
+        self.fp32_path = os.path.splitext(index_path)[0] + ".f32.bin"
+        self._fp32: Optional[np.ndarray] = None
+        self._fp32_warned = False
+        self.index: faiss.Index | None = None
         self.id_to_meta: Dict[int, Dict[str, Any]] = {}
+        # chunks per source file, kept alongside id_to_meta so stats() needn't scan it
+        self.source_files: Counter = Counter()
         self._next_id: int = 0
+        self._mapped = False
+        self._gpu_res = None  # set while self.index lives on a GPU
+        # Vectors added since the last save, and in the on-disk delta log
+        self.delta_vectors_path = os.path.splitext(index_path)[0] + ".delta.bin"
+        self.delta_meta_path = os.path.splitext(metadata_path)[0] + ".delta.jsonl"
+        self._unsaved: List[Tuple[np.ndarray, List[Tuple[int, Dict[str, Any]]]]] = []
+        self._delta_count = 0
+        # True when the base index file no longer matches the in-memory layout
+        self._base_stale = True
+        self._stats: Optional[Tuple[float, Dict[str, Any]]] = None  # (expires, stats())
+        # Held by every public method: servers add/save from worker threads
+        # while searching on the event loop, and faiss releases the GIL
+        self.lock = threading.RLock()
 
     def _ensure_index(self, dim: int):
         if self.index is None:
             self.index = faiss.IndexFlatIP(dim)
+            self._base_stale = True
+
+    def _read_index(self, mmap: bool):
+        """Read the index file, memory-mapped read-only if `mmap` and supported.
+
+        A mapped index is paged in by the kernel as searches touch it instead
+        of being copied into RAM up front.
+        """
+        if mmap:
+            try:
+                self.index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                self._mapped = True
+                self._gpu_res = None
+                self._set_nprobe()
+                return
+            except RuntimeError:
+                pass
+        self.index = faiss.read_index(self.index_path)
+        self._mapped = False
+        self._gpu_res = None
+        self._set_nprobe()
+
+    def _ensure_writable(self):
+        # a read-only mapping must not be mutated or have its file rewritten under it
+        if self._mapped:
+            self._read_index(mmap=False)
 
-    def load(self) -> int:
+    @_locked
+    def load(self, mmap: bool = True) -> int:
+        self._stats = None
         vectors = 0
+        self._unsaved.clear()
+        self._delta_count = 0
+        self._base_stale = True
         if os.path.exists(self.index_path):
-            self.index = faiss.read_index(self.index_path)
+            self._read_index(mmap)
+            self._base_stale = False
             vectors = self.index.ntotal
         if os.path.exists(self.metadata_path):
             with open(self.metadata_path, "r", encoding="utf-8") as f:
                 payload = json.load(f)
                 # keys are strings; convert to int
                 self.id_to_meta = {int(k): v for k, v in payload.get("id_to_meta", {}).items()}
+                self.source_files = Counter(m.get("source_file") for m in self.id_to_meta.values())
                 self._next_id = int(payload.get("next_id", vectors))
         else:
             self.id_to_meta = {}
+            self.source_files = Counter()
             self._next_id = vectors
-        return vectors
+        replayed = self._replay_delta()
+        if mmap and replayed:
+            # replaying copied the index into memory; fold the delta into the
+            # base file and map it again so this and later loads stay zero-copy
+            self.compact()
+            self._read_index(mmap=True)
+        return vectors + replayed
 
+    def _replay_delta(self) -> int:
+        """Add the vectors logged since the base index was written; returns how many."""
+        if self.index is None or not os.path.exists(self.delta_meta_path):
+            return 0
+        entries = []
+        with open(self.delta_meta_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break  # torn last line
+        d = self.index.d
+        vectors = np.zeros(0, dtype=np.float32)
+        if os.path.exists(self.delta_vectors_path):
+            vectors = np.fromfile(self.delta_vectors_path, dtype=np.float32)
+        n = min(len(entries), vectors.size // d)
+        if n != len(entries) or n * d != vectors.size:
+            # the two logs disagree; rewrite the base on the next save so they can't drift further
+            self._base_stale = True
+        if n == 0:
+            return 0
+        self._ensure_writable()
+        self.index.add(vectors[:n * d].reshape(n, d))
+        for entry in entries[:n]:
+            self.id_to_meta[int(entry["id"])] = entry["meta"]
+            self.source_files[entry["meta"].get("source_file")] += 1
+        self._next_id = max(self._next_id, int(entries[n - 1]["id"]) + 1)
+        self._delta_count = n
+        return n
+
+    @_locked
     def save(self):
+        """Persist changes since the last save.
+
+        New vectors are appended to the delta log (O(new vectors)) while it
+        stays under DELTA_COMPACT_RATIO of the index; otherwise, or when the
+        index was rebuilt, the full index and metadata are rewritten.
+        """
+        self._stats = None
+        pending = sum(len(vectors) for vectors, _ in self._unsaved)
+        if self.keep_fp32 and pending and not isinstance(self.index, faiss.IndexFlat):
+            self._append_fp32()
+        if (
+            self._base_stale
+            or self.index is None
+            or not os.path.exists(self.index_path)
+            or self._delta_count + pending > DELTA_COMPACT_RATIO * self.index.ntotal
+        ):
+            self.compact()
+        elif pending:
+            self._append_delta(pending)
+
+    def _write_fp32(self, vectors: np.ndarray):
+        """Replace the float32 copies with `vectors` (every row of a just-rebuilt index)."""
+        if not self.keep_fp32:
+            return
+        self._fp32 = None
+        with open(self.fp32_path, "wb") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+
+    def _append_fp32(self):
+        """Append the unsaved vectors the float32 copies don't hold yet."""
+        d = self.index.d
+        have = os.path.getsize(self.fp32_path) // (4 * d) if os.path.exists(self.fp32_path) else 0
+        missing = self.index.ntotal - have
+        if missing <= 0:
+            return  # e.g. already written by the rebuild that quantized the index
+        pending = np.concatenate([vectors for vectors, _ in self._unsaved])
+        if missing > len(pending):
+            # rows from before the sidecar existed can't be recovered from quantized codes
+            return
+        self._fp32 = None  # drop the old mapping before the file grows
+        with open(self.fp32_path, "ab") as f:
+            f.write(pending[len(pending) - missing:].tobytes())
+
+    def _fp32_rows(self) -> Optional[np.ndarray]:
+        """Memory-mapped exact vectors, or None if they don't line up with the index."""
+        if self._fp32 is None:
+            rows = None
+            if os.path.exists(self.fp32_path):
+                rows = np.memmap(self.fp32_path, dtype=np.float32, mode="r")
+            if rows is None or rows.size != self.index.ntotal * self.index.d:
+                if not self._fp32_warned:
+                    self._fp32_warned = True
+                    logger.warning(
+                        "Float32 rescoring disabled for %s: %s holds %d rows for %d vectors",
+                        self.index_path, self.fp32_path,
+                        0 if rows is None else rows.size // self.index.d, self.index.ntotal,
+                    )
+                return None
+            self._fp32_warned = False
+            self._fp32 = rows.reshape(-1, self.index.d)
+        return self._fp32
+
+    def _append_delta(self, pending: int):
+        with open(self.delta_vectors_path, "ab") as vf, open(self.delta_meta_path, "a", encoding="utf-8") as mf:
+            for vectors, entries in self._unsaved:
+                vf.write(vectors.tobytes())
+                mf.writelines(json.dumps({"id": idx, "meta": meta}, ensure_ascii=False) + "\n" for idx, meta in entries)
+            for f in (vf, mf):
+                f.flush()
+                os.fsync(f.fileno())
+        self._delta_count += pending
+        self._unsaved.clear()
+
+    @_locked
+    def compact(self):
+        """Rewrite the full index and metadata files and drop the delta log."""
+        self._ensure_writable()
         if self.index is not None:
-            faiss.write_index(self.index, self.index_path)
+            index = faiss.index_gpu_to_cpu(self.index) if self._gpu_res is not None else self.index
+            faiss.write_index(index, self.index_path)
         with open(self.metadata_path, "w", encoding="utf-8") as f:
             json.dump({"id_to_meta": self.id_to_meta, "next_id": self._next_id}, f, ensure_ascii=False)
+        for path in (self.delta_vectors_path, self.delta_meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._unsaved.clear()
+        self._delta_count = 0
+        self._base_stale = False
 
+    @_locked
     def add(self, embeddings: np.ndarray, metadatas: List[Dict[str, Any]]):
         assert embeddings.ndim == 2
-        # normalize for cosine similarity using inner product
-        norms = np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
-        embeddings = embeddings / norms
+        # normalize in place for cosine similarity using inner product
+        embeddings = np.array(embeddings, dtype=np.float32, order="C")
+        faiss.normalize_L2(embeddings)
+        self._ensure_writable()
         self._ensure_index(embeddings.shape[1])
+        self._stats = None
         start_id = self._next_id
-        self.index.add(embeddings.astype(np.float32))
+        self.index.add(embeddings)
         for i, meta in enumerate(metadatas):
             self.id_to_meta[start_id + i] = meta
+        self.source_files.update(meta.get("source_file") for meta in metadatas)
         self._next_id += embeddings.shape[0]
+        self._unsaved.append((embeddings, [(start_id + i, meta) for i, meta in enumerate(metadatas)]))
 
-    def search(self, query_emb: np.ndarray, top_k: int) -> List[Tuple[float, Dict[str, Any]]]:
+    @_locked
+    def to_gpu(self, device: int = 0) -> bool:
+        """Move the index to a CUDA device if this faiss build has one; returns True if moved.
+
+        Saves still write a CPU copy, so the files stay portable.
+        """
+        if self.index is None or self._gpu_res is not None:
+            return False
+        if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+            return False
+        res = faiss.StandardGpuResources()
+        self.index = faiss.index_cpu_to_gpu(res, device, self.index)
+        self._gpu_res = res
+        self._mapped = False  # the GPU holds its own copy
+        return True
+
+    def _set_nprobe(self):
+        ivf = faiss.try_extract_index_ivf(self.index) if self.index is not None else None
+        if ivf is not None:
+            ivf.nprobe = self.nprobe
+
+    @_locked
+    def promote_to_ivf(self, threshold: int = IVF_THRESHOLD) -> bool:
+        """Rebuild a flat (or scalar-quantized) index holding more than `threshold` vectors as IVF-PQ.
+
+        Searching an inverted-file index only scans `nprobe` of its
+        ~4*sqrt(N) clusters, and PQ codes shrink memory about 16x versus
+        float32 vectors. Ids are preserved, so metadata stays valid. Returns
+        True if the index was rebuilt.
+        """
+        if not isinstance(self.index, (faiss.IndexFlat, faiss.IndexScalarQuantizer)) or self.index.ntotal <= threshold:
+            return False
+        n, d = self.index.ntotal, self.index.d
+        vectors = self.index.reconstruct_n(0, n)
+        nlist = int(4 * math.sqrt(n))
+        quantizer = faiss.IndexFlatIP(d)
+        if d % IVF_PQ_M == 0:
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, IVF_PQ_M, 8, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, d, nlist, faiss.METRIC_INNER_PRODUCT)
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(n, size=min(n, IVF_TRAIN_SAMPLE), replace=False)]
+        index.train(sample)
+        index.add(vectors)
+        self.index = index
+        self._write_fp32(vectors)
+        self._mapped = False
+        self._base_stale = True
+        self._set_nprobe()
+        return True
+
+    @_locked
+    def apply_index_spec(self) -> bool:
+        """Rebuild the flat index as `index_spec` (e.g. "IVF100,SQfp16").
+
+        Specs that need training wait until there are at least 4 vectors per
+        IVF list and training succeeds; until then the index stays flat.
+        Returns True if the index was rebuilt.
+        """
+        if not self.index_spec or not isinstance(self.index, faiss.IndexFlat) or self.index.ntotal == 0:
+            return False
+        n, d = self.index.ntotal, self.index.d
+        index = faiss.index_factory(d, self.index_spec, faiss.METRIC_INNER_PRODUCT)
+        hnsw = getattr(index, "hnsw", None)
+        if hnsw is not None:
+            # needs no training; efSearch is saved with the index
+            hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            hnsw.efSearch = HNSW_EF_SEARCH
+        vectors = self.index.reconstruct_n(0, n)
+        if not index.is_trained:
+            ivf = faiss.try_extract_index_ivf(index)
+            if ivf is not None and n < 4 * ivf.nlist:
+                return False
+            rng = np.random.default_rng(0)
+            try:
+                index.train(vectors[rng.choice(n, size=min(n, IVF_TRAIN_SAMPLE), replace=False)])
+            except RuntimeError:
+                return False  # e.g. fewer vectors than PQ centroids
+        index.add(vectors)
+        self.index = index
+        self._write_fp32(vectors)
+        self._mapped = False
+        self._base_stale = True
+        self._set_nprobe()
+        return True
+
+    @_locked
+    def quantize_sq8(self) -> bool:
+        """Rebuild a float32 flat index as an 8-bit scalar-quantized one.
+
+        Codes take a quarter of the memory and disk of float32 vectors at a
+        negligible cost in top-k recall. Vectors keep their sequential ids,
+        so metadata stays valid and later add() calls work unchanged. Returns
+        True if the index was rebuilt.
+        """
+        if not isinstance(self.index, faiss.IndexFlat) or self.index.ntotal == 0:
+            return False
+        n, d = self.index.ntotal, self.index.d
+        vectors = self.index.reconstruct_n(0, n)
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        rng = np.random.default_rng(0)
+        index.train(vectors[rng.choice(n, size=min(n, SQ_TRAIN_SAMPLE), replace=False)])
+        index.add(vectors)
+        self.index = index
+        self._write_fp32(vectors)
+        self._mapped = False
+        self._base_stale = True
+        return True
+
+    @_locked
+    def search(self, query_emb: np.ndarray, top_k: int,
+               rescore_multiplier: int = 1) -> List[Tuple[float, Dict[str, Any]]]:
+        """Top-k (score, metadata) pairs by cosine similarity.
+
+        With `rescore_multiplier` > 1 on a quantized index that keeps float32
+        copies, top_k * rescore_multiplier candidates are fetched and re-ranked
+        by their exact scores.
+        """
         assert query_emb.ndim == 1
-        # normalize
-        norm = np.linalg.norm(query_emb) + 1e-12
-        q = (query_emb / norm).astype(np.float32)[None, :]
         if self.index is None or self.index.ntotal == 0:
             return []
-        scores, ids = self.index.search(q, top_k)
+        # normalize
+        q = np.array(query_emb, dtype=np.float32)[None, :]
+        faiss.normalize_L2(q)
+        exact = None
+        if rescore_multiplier > 1 and self.keep_fp32 and not isinstance(self.index, faiss.IndexFlat):
+            exact = self._fp32_rows()
+        scores, ids = self.index.search(q, top_k * rescore_multiplier if exact is not None else top_k)
+        if exact is not None:
+            candidates = ids[0][ids[0] >= 0]
+            exact_scores = exact[candidates] @ q[0]
+            order = np.argsort(-exact_scores)[:top_k]
+            scores, ids = exact_scores[order][None, :], candidates[order][None, :]
         result: List[Tuple[float, Dict[str, Any]]] = []
         for score, idx in zip(scores[0].tolist(), ids[0].tolist()):
             if idx == -1:
@@ -72,15 +414,21 @@ class FaissStore:
             result.append((float(score), meta))
         return result
 
+    @_locked
     def stats(self) -> Dict[str, Any]:
-        return {
+        now = time.monotonic()
+        if self._stats is not None and now < self._stats[0]:
+            return dict(self._stats[1])
+        stats = {
             "vectors": 0 if self.index is None else int(self.index.ntotal),
-            "files_indexed": len({m.get("source_file") for m in self.id_to_meta.values()}),
+            "files_indexed": len(self.source_files),
             "index_path": os.path.abspath(self.index_path),
             "metadata_path": os.path.abspath(self.metadata_path),
             "index_exists": os.path.exists(self.index_path),
             "last_modified": _last_modified(self.index_path),
         }
+        self._stats = (now + STATS_TTL, stats)
+        return dict(stats)
 
 
 def _last_modified(path: str) -> str | None:
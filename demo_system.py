@@ -7,11 +7,11 @@ summarization system with intelligent query routing.
 """
 
 import asyncio
-import json
 import time
 from typing import Dict, List
 
 import httpx
+import orjson
 
 
 class SystemDemo:
@@ -20,19 +20,30 @@ class SystemDemo:
     def __init__(self):
         self.base_url = "http://localhost:8000"
         self.timeout = httpx.Timeout(30.0)
+        self._client: httpx.AsyncClient | None = None
+    
+    async def __aenter__(self):
+        # One pooled client for the whole demo, so requests reuse keep-alive connections
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout, limits=httpx.Limits(max_keepalive_connections=20)
+        )
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+        self._client = None
     
     async def check_system_health(self) -> bool:
         """Check if the system is running and healthy"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/health")
-                if response.status_code == 200:
-                    health_data = response.json()
-                    print(f"✅ System Health: {health_data['status']}")
-                    return True
-                else:
-                    print(f"❌ System Health Check Failed: {response.status_code}")
-                    return False
+            response = await self._client.get(f"{self.base_url}/health")
+            if response.status_code == 200:
+                health_data = response.json()
+                print(f"✅ System Health: {health_data['status']}")
+                return True
+            else:
+                print(f"❌ System Health Check Failed: {response.status_code}")
+                return False
         except Exception as e:
             print(f"❌ System Not Available: {e}")
             return False
@@ -40,35 +51,33 @@ class SystemDemo:
     async def get_system_stats(self) -> Dict:
         """Get comprehensive system statistics"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.base_url}/stats")
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    return {"error": f"HTTP {response.status_code}"}
+            response = await self._client.get(f"{self.base_url}/stats")
+            if response.status_code == 200:
+                return response.json()
+            else:
+                return {"error": f"HTTP {response.status_code}"}
         except Exception as e:
             return {"error": str(e)}
     
     async def query_system(self, question: str, server: str = None) -> Dict:
         """Query the system with intelligent routing"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                if server:
-                    # Direct query to specific server
-                    url = f"{self.base_url}/query/{server}"
-                else:
-                    # Intelligent routing
-                    url = f"{self.base_url}/query"
-                
-                response = await client.post(
-                    url,
-                    json={"question": question}
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    return {"error": f"HTTP {response.status_code}: {response.text}"}
+            if server:
+                # Direct query to specific server
+                url = f"{self.base_url}/query/{server}"
+            else:
+                # Intelligent routing
+                url = f"{self.base_url}/query"
+            
+            response = await self._client.post(
+                url,
+                json={"question": question}
+            )
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                return {"error": f"HTTP {response.status_code}: {response.text}"}
         except Exception as e:
             return {"error": str(e)}
     
@@ -101,13 +110,13 @@ class SystemDemo:
             }
         ]
         
-        for i, test in enumerate(test_queries, 1):
+        # Query with intelligent routing; the queries are independent, so send them together
+        results = await asyncio.gather(*(self.query_system(test['question']) for test in test_queries))
+        
+        for i, (test, result) in enumerate(zip(test_queries, results), 1):
             print(f"\n📝 Test {i}: {test['description']}")
             print(f"Question: {test['question']}")
             
-            # Query with intelligent routing
-            result = await self.query_system(test['question'])
-            
             if 'error' in result:
                 print(f"❌ Error: {result['error']}")
             else:
@@ -143,10 +152,10 @@ class SystemDemo:
         print("\nComparing responses from different server levels:")
         
         servers = ["server1", "server2", "server3"]
+        results = await asyncio.gather(*(self.query_system(question, server) for server in servers))
         
-        for server in servers:
-            print(f"\n📡 Querying {server}...")
-            result = await self.query_system(question, server)
+        for server, result in zip(servers, results):
+            print(f"\n📡 {server}:")
             
             if 'error' in result:
                 print(f"❌ Error: {result['error']}")
@@ -175,7 +184,7 @@ class SystemDemo:
         print("\n📊 System Statistics:")
         stats = await self.get_system_stats()
         if 'error' not in stats:
-            print(json.dumps(stats, indent=2))
+            print(orjson.dumps(stats, option=orjson.OPT_INDENT_2).decode())
         else:
             print(f"❌ Error getting stats: {stats['error']}")
         
@@ -199,10 +208,9 @@ async def main():
     print("🎯 Multi-Level Summarization System Demo")
     print("=" * 60)
     
-    demo = SystemDemo()
-    
     try:
-        await demo.demonstrate_system_capabilities()
+        async with SystemDemo() as demo:
+            await demo.demonstrate_system_capabilities()
     except KeyboardInterrupt:
         print("\n\n⏹️ Demo interrupted by user")
     except Exception as e:
@@ -22,6 +22,8 @@ python test_system.py
 """
 
 import asyncio
+import contextlib
+import importlib.util
 import json
 import logging
 import os
@@ -29,8 +31,8 @@ import signal
 import subprocess
 import sys
 import time
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from typing import IO, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import httpx
@@ -39,6 +41,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
+from backend.cache import TTLCache
+
 
 # Configure logging
 logging.basicConfig(
@@ -47,6 +51,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# check_server_health answers from cache within this many seconds of a probe
+HEALTH_CACHE_TTL = 5.0
+# start_server gives a new process this long to answer /health
+STARTUP_TIMEOUT = 30.0
+# stop_server waits this long after SIGTERM before killing the server
+STOP_TIMEOUT = 5.0
+# Each subprocess server's stdout and stderr go to LOG_DIR/<name>.log; the
+# previous run's log is kept as <name>.log.1, so at most two runs are on disk
+LOG_DIR = "logs"
+
 
 @dataclass
 class ServerConfig:
@@ -56,6 +70,34 @@ class ServerConfig:
     script_path: str
     description: str
     dependencies: List[str] = None
+    # "package.module:app" for uvicorn, derived from script_path
+    uvicorn_target: str = field(init=False)
+    
+    def __post_init__(self):
+        module = Path(self.script_path).with_suffix("").as_posix().replace("/", ".")
+        self.uvicorn_target = f"{module}:app"
+
+
+def _read_tail(path: str, limit: int = 65536) -> str:
+    """The last `limit` bytes of the log file at `path`."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - limit))
+        return f.read().decode(errors="replace")
+
+
+def _terminate(process: subprocess.Popen, force: bool = False):
+    """SIGTERM (or SIGKILL with `force`) a server's whole process group.
+    
+    Where there are no process groups (Windows) only the process itself is signalled.
+    """
+    if hasattr(os, "killpg"):
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+    elif force:
+        process.kill()
+    else:
+        process.terminate()
 
 
 class SystemManager:
@@ -65,11 +107,11 @@ class SystemManager:
         # Load environment variables from .env file
         backend_dir = os.path.join(os.path.dirname(__file__), "backend")
         env_path = os.path.join(backend_dir, ".env")
-        if os.path.exists(env_path):
-            load_dotenv(env_path)
-            logger.info(f"Loaded environment variables from {env_path}")
+        # load_dotenv is a no-op returning False when the file is missing (or empty)
+        if load_dotenv(env_path):
+            logger.info("Loaded environment variables from %s", env_path)
         else:
-            logger.warning(f"No .env file found at {env_path}")
+            logger.warning("No .env file found at %s", env_path)
         
         self.servers = {
             "server1": ServerConfig(
@@ -102,16 +144,47 @@ class SystemManager:
             )
         }
         
+        # Dependencies before dependents; used for starting (and, reversed, stopping)
+        self._start_order = self._toposort()
+        
         self.processes: Dict[str, subprocess.Popen] = {}
+        self._log_files: Dict[str, IO[bytes]] = {}
+        # Servers run as tasks in this process by serve_inproc()
+        self.inproc_servers: Dict[str, uvicorn.Server] = {}
         self.running = False
+        # Shared by all health probes (see _get_http); bound to the event loop that created it
+        self._http: Optional[httpx.AsyncClient] = None
+        # Recent /health results per server, so overlapping status/monitor calls share probes
+        self._health_cache = TTLCache(maxsize=len(self.servers), ttl=HEALTH_CACHE_TTL)
         
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
     
+    def _toposort(self) -> List[str]:
+        """Order self.servers so every server comes after its dependencies (Kahn's algorithm)."""
+        pending = {name: set(config.dependencies or []) for name, config in self.servers.items()}
+        for name, deps in pending.items():
+            unknown = deps - pending.keys()
+            if unknown:
+                raise ValueError(f"Server {name} depends on unknown servers: {sorted(unknown)}")
+        order = []
+        ready = [name for name, deps in pending.items() if not deps]
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for other, deps in pending.items():
+                if name in deps:
+                    deps.discard(name)
+                    if not deps:
+                        ready.append(other)
+        if len(order) != len(pending):
+            raise ValueError(f"Dependency cycle among servers: {sorted(set(pending) - set(order))}")
+        return order
+    
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully"""
-        logger.info(f"Received signal {signum}, shutting down...")
+        logger.info("Received signal %s, shutting down...", signum)
         self.stop_all_servers()
         sys.exit(0)
     
@@ -131,16 +204,20 @@ class SystemManager:
             ("numpy", "numpy")
         ]
         
+        # find_spec only locates the modules; importing them here would load
+        # faiss, numpy and the Gemini SDK into the manager for nothing
         missing_packages = []
         for package_name, import_name in required_packages:
             try:
-                __import__(import_name)
-            except ImportError:
+                found = importlib.util.find_spec(import_name) is not None
+            except ModuleNotFoundError:  # parent package of a dotted name is missing
+                found = False
+            if not found:
                 missing_packages.append(package_name)
         
         if missing_packages:
-            logger.error(f"Missing required packages: {missing_packages}")
-            logger.error("Please install them with: pip install " + " ".join(missing_packages))
+            logger.error("Missing required packages: %s", missing_packages)
+            logger.error("Please install them with: pip install %s", " ".join(missing_packages))
             return False
         
         # Check API key
@@ -151,9 +228,11 @@ class SystemManager:
         # Check directories
         required_dirs = ["backend/pdfs/raw", "backend/pdfs/summaries"]
         for dir_path in required_dirs:
-            if not os.path.exists(dir_path):
-                logger.warning(f"Directory {dir_path} does not exist, creating...")
-                os.makedirs(dir_path, exist_ok=True)
+            try:
+                os.makedirs(dir_path)
+            except FileExistsError:
+                continue
+            logger.warning("Directory %s did not exist, created it", dir_path)
         
         logger.info("All dependencies satisfied")
         return True
@@ -161,76 +240,116 @@ class SystemManager:
     def start_server(self, server_name: str) -> bool:
         """Start a specific server"""
         if server_name not in self.servers:
-            logger.error(f"Unknown server: {server_name}")
+            logger.error("Unknown server: %s", server_name)
             return False
         
         if server_name in self.processes:
-            logger.warning(f"Server {server_name} is already running")
+            logger.warning("Server %s is already running", server_name)
             return True
         
         config = self.servers[server_name]
         
         # Check dependencies
-        for dep in config.dependencies:
+        for dep in config.dependencies or []:
             if dep not in self.processes:
-                logger.error(f"Cannot start {server_name}: dependency {dep} is not running")
+                logger.error("Cannot start %s: dependency %s is not running", server_name, dep)
                 return False
         
         try:
-            logger.info(f"Starting {server_name} on port {config.port}...")
+            logger.info("Starting %s on port %s...", server_name, config.port)
             
-            # Start the server process
+            # Start the server process. Its output goes to a file: a pipe nobody
+            # reads fills up and then blocks the server's own logging.
+            os.makedirs(LOG_DIR, exist_ok=True)
+            log_path = os.path.join(LOG_DIR, f"{server_name}.log")
+            try:
+                os.replace(log_path, log_path + ".1")
+            except FileNotFoundError:
+                pass
+            log_file = open(log_path, "wb")
+            self._log_files[server_name] = log_file
             process = subprocess.Popen([
                 sys.executable, "-m", "uvicorn", 
-                config.script_path.replace(".py", "").replace("/", ".") + ":app",
+                config.uvicorn_target,
                 "--host", "0.0.0.0",
                 "--port", str(config.port),
                 "--log-level", "info"
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            ], stdout=log_file, stderr=subprocess.STDOUT, close_fds=True,
+               # own process group, so stop_server can signal any workers along with it
+               start_new_session=True)
             
             self.processes[server_name] = process
+            self._health_cache.pop(server_name)
             
-            # Wait a moment and check if it started successfully
-            time.sleep(2)
-            if process.poll() is not None:
-                stdout, stderr = process.communicate()
-                logger.error(f"Server {server_name} failed to start:")
-                logger.error(f"STDOUT: {stdout.decode()}")
-                logger.error(f"STDERR: {stderr.decode()}")
+            # Ready as soon as it answers /health, rather than after a fixed sleep
+            if not self._wait_ready(process, config.port):
+                if process.poll() is not None:
+                    logger.error("Server %s failed to start (full output in %s):", server_name, log_path)
+                    if logger.isEnabledFor(logging.ERROR):
+                        logger.error("%s", _read_tail(log_path))
+                    del self.processes[server_name]
+                    self._log_files.pop(server_name).close()
+                else:
+                    logger.error("Server %s did not answer /health within %.0fs", server_name, STARTUP_TIMEOUT)
+                    self.stop_server(server_name)
                 return False
             
-            logger.info(f"Server {server_name} started successfully on port {config.port}")
+            logger.info("Server %s started successfully on port %s", server_name, config.port)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to start {server_name}: {e}")
+            logger.error("Failed to start %s: %s", server_name, e)
+            if server_name not in self.processes and server_name in self._log_files:
+                self._log_files.pop(server_name).close()
             return False
     
+    def _wait_ready(self, process: subprocess.Popen, port: int, timeout: float = STARTUP_TIMEOUT) -> bool:
+        """Poll /health, backing off from 25 ms to 400 ms, until it answers 200.
+        
+        Gives up if the process exits or `timeout` seconds pass.
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.025
+        with httpx.Client(timeout=1.0) as client:
+            while time.monotonic() < deadline:
+                if process.poll() is not None:
+                    return False
+                try:
+                    if client.get(f"http://localhost:{port}/health").status_code == 200:
+                        return True
+                except httpx.HTTPError:
+                    pass
+                time.sleep(delay)
+                delay = min(delay * 2, 0.4)
+        return False
+    
     def stop_server(self, server_name: str) -> bool:
         """Stop a specific server"""
         if server_name not in self.processes:
-            logger.warning(f"Server {server_name} is not running")
+            logger.warning("Server %s is not running", server_name)
             return True
         
         try:
-            logger.info(f"Stopping {server_name}...")
+            logger.info("Stopping %s...", server_name)
             process = self.processes[server_name]
-            process.terminate()
+            _terminate(process)
             
             # Wait for graceful shutdown
             try:
-                process.wait(timeout=10)
+                process.wait(timeout=STOP_TIMEOUT)
             except subprocess.TimeoutExpired:
-                logger.warning(f"Server {server_name} did not stop gracefully, forcing...")
-                process.kill()
+                logger.warning("Server %s did not stop gracefully, forcing...", server_name)
+                _terminate(process, force=True)
                 process.wait()
             
             del self.processes[server_name]
-            logger.info(f"Server {server_name} stopped")
+            self._health_cache.pop(server_name)
+            self._log_files.pop(server_name).close()
+            logger.info("Server %s stopped", server_name)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to stop {server_name}: {e}")
+            logger.error("Failed to stop %s: %s", server_name, e)
             return False
     
     def start_all_servers(self) -> bool:
@@ -244,18 +363,16 @@ class SystemManager:
         started = []
         failed = []
         
-        for server_name in ["server1", "server2", "server3", "orchestrator"]:
+        for server_name in self._start_order:
             if self.start_server(server_name):
                 started.append(server_name)
-                # Wait a bit between server starts
-                time.sleep(3)
             else:
                 failed.append(server_name)
                 # Stop dependent servers if this one failed
                 break
         
         if failed:
-            logger.error(f"Failed to start servers: {failed}")
+            logger.error("Failed to start servers: %s", failed)
             logger.info("Stopping started servers...")
             for server_name in reversed(started):
                 self.stop_server(server_name)
@@ -266,34 +383,139 @@ class SystemManager:
         logger.info("System is ready for queries")
         return True
     
+    async def serve_inproc(self) -> bool:
+        """Run every app as a uvicorn.Server task in this process until shut down.
+
+        The apps share one interpreter, so faiss, numpy and the Gemini SDK are
+        imported once, and each start waits for the server to report it is
+        listening rather than sleeping. They also share one event loop, so a
+        handler that blocks it stalls every server. SIGINT/SIGTERM shut all of
+        them down gracefully. Returns False if a server failed to start.
+        """
+        if not self.check_dependencies():
+            return False
+        
+        tasks = []
+        for server_name in self._start_order:
+            config = self.servers[server_name]
+            logger.info("Starting %s in-process on port %s...", server_name, config.port)
+            server = uvicorn.Server(uvicorn.Config(config.uvicorn_target, host="0.0.0.0", port=config.port, log_level="info"))
+            # The manager handles signals for all servers (see below), not each uvicorn.Server
+            server.capture_signals = contextlib.nullcontext
+            task = asyncio.create_task(server.serve())
+            while not server.started and not task.done():
+                await asyncio.sleep(0.05)
+            if not server.started:
+                logger.error("Server %s failed to start", server_name)
+                for running in self.inproc_servers.values():
+                    running.should_exit = True
+                await asyncio.gather(*tasks, task, return_exceptions=True)
+                self.inproc_servers.clear()
+                return False
+            self.inproc_servers[server_name] = server
+            tasks.append(task)
+            logger.info("Server %s started successfully on port %s", server_name, config.port)
+        
+        def shutdown():
+            logger.info("Shutting down in-process servers...")
+            for server in self.inproc_servers.values():
+                server.should_exit = True
+        
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, shutdown)
+            except NotImplementedError:  # Windows: Ctrl-C raises KeyboardInterrupt instead
+                pass
+        
+        self.running = True
+        logger.info("All servers started successfully!")
+        logger.info("System is ready for queries")
+        monitor = asyncio.create_task(self._monitor())
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.running = False
+            monitor.cancel()
+            await asyncio.gather(monitor, return_exceptions=True)
+            self.inproc_servers.clear()
+            await self.close_http()
+        logger.info("All servers stopped")
+        return True
+    
     def stop_all_servers(self):
         """Stop all running servers"""
         logger.info("Stopping all servers...")
         
-        # Stop in reverse order
-        for server_name in reversed(list(self.processes.keys())):
-            self.stop_server(server_name)
+        # Signal all servers (dependents before their dependencies) first, so
+        # their graceful shutdowns overlap and share one STOP_TIMEOUT deadline
+        names = [name for name in reversed(self._start_order) if name in self.processes]
+        for server_name in names:
+            logger.info("Stopping %s...", server_name)
+            _terminate(self.processes[server_name])
+        
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for server_name in names:
+            process = self.processes.pop(server_name)
+            try:
+                process.wait(timeout=max(0.1, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.warning("Server %s did not stop gracefully, forcing...", server_name)
+                _terminate(process, force=True)
+                process.wait()
+            self._health_cache.pop(server_name)
+            self._log_files.pop(server_name).close()
+            logger.info("Server %s stopped", server_name)
         
         self.running = False
         logger.info("All servers stopped")
     
+    async def _get_http(self) -> httpx.AsyncClient:
+        """The manager's pooled HTTP client, created on first use."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=5.0, limits=httpx.Limits(max_keepalive_connections=16),
+                # negotiated over TLS only; needs the h2 package (httpx[http2])
+                http2=importlib.util.find_spec("h2") is not None,
+            )
+        return self._http
+    
+    async def close_http(self):
+        """Close the shared client; call before the event loop that used it ends."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
+    async def _status_once(self) -> Dict:
+        """get_system_status() for a caller that runs it in its own asyncio.run()."""
+        try:
+            return await self.get_system_status()
+        finally:
+            await self.close_http()
+    
     async def check_server_health(self, server_name: str) -> Dict:
         """Check health of a specific server"""
         if server_name not in self.servers:
             return {"error": f"Unknown server: {server_name}"}
         
+        cached = self._health_cache.get(server_name)
+        if cached is not None:
+            return cached
+        
         config = self.servers[server_name]
         url = f"http://localhost:{config.port}"
         
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{url}/health")
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    return {"error": f"HTTP {response.status_code}: {response.text}"}
+            client = await self._get_http()
+            response = await client.get(f"{url}/health")
+            if response.status_code == 200:
+                health = response.json()
+            else:
+                health = {"error": f"HTTP {response.status_code}: {response.text}"}
         except Exception as e:
-            return {"error": str(e)}
+            health = {"error": str(e)}
+        self._health_cache.set(server_name, health)
+        return health
     
     async def get_system_status(self) -> Dict:
         """Get comprehensive system status"""
@@ -306,14 +528,22 @@ class SystemManager:
         healthy_count = 0
         total_count = len(self.servers)
         
-        for server_name in self.servers:
+        # Probe all servers at once: a down server costs one timeout, not one each
+        names = list(self.servers)
+        healths = await asyncio.gather(
+            *(self.check_server_health(name) for name in names), return_exceptions=True
+        )
+        
+        for server_name, health in zip(names, healths):
+            if isinstance(health, BaseException):
+                health = {"error": str(health)}
             config = self.servers[server_name]
             server_status = {
                 "name": server_name,
                 "port": config.port,
                 "description": config.description,
-                "running": server_name in self.processes,
-                "health": await self.check_server_health(server_name)
+                "running": server_name in self.processes or server_name in self.inproc_servers,
+                "health": health
             }
             
             if server_status["running"] and "error" not in server_status["health"]:
@@ -336,30 +566,37 @@ class SystemManager:
     
     def run_monitoring_loop(self):
         """Run continuous monitoring of the system"""
+        try:
+            asyncio.run(self._monitor())
+        except KeyboardInterrupt:
+            logger.info("Monitoring stopped by user")
+    
+    async def _monitor(self):
+        """Monitoring loop; one event loop and HTTP client for all its checks."""
         logger.info("Starting system monitoring...")
         
         try:
             while self.running:
                 # Check system status
-                status = asyncio.run(self.get_system_status())
+                status = await self.get_system_status()
                 
                 # Log status
-                logger.info(f"System health: {status['overall_health']} "
-                          f"({status['healthy_count']}/{status['total_count']} servers)")
+                logger.info("System health: %s (%d/%d servers)",
+                            status['overall_health'], status['healthy_count'], status['total_count'])
                 
                 # Check for crashed servers
                 for server_name, server_status in status["servers"].items():
                     if server_status["running"] and "error" in server_status["health"]:
-                        logger.warning(f"Server {server_name} appears unhealthy: "
-                                    f"{server_status['health']['error']}")
+                        logger.warning("Server %s appears unhealthy: %s",
+                                       server_name, server_status['health']['error'])
                 
                 # Wait before next check
-                time.sleep(30)
+                await asyncio.sleep(30)
                 
-        except KeyboardInterrupt:
-            logger.info("Monitoring stopped by user")
         except Exception as e:
-            logger.error(f"Monitoring error: {e}")
+            logger.error("Monitoring error: %s", e)
+        finally:
+            await self.close_http()
 
 
 def main():
@@ -370,6 +607,8 @@ def main():
     parser.add_argument("command", choices=["start", "stop", "status", "monitor", "restart"],
                        help="Command to execute")
     parser.add_argument("--server", help="Specific server to operate on")
+    parser.add_argument("--inproc", action="store_true",
+                       help="With 'start' (all servers): run every app in this process instead of one subprocess each")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose logging")
     
     args = parser.parse_args()
@@ -380,6 +619,12 @@ def main():
     manager = SystemManager()
     
     if args.command == "start":
+        if args.inproc and not args.server:
+            try:
+                success = asyncio.run(manager.serve_inproc())
+            except KeyboardInterrupt:
+                success = True
+            sys.exit(0 if success else 1)
         if args.server:
             success = manager.start_server(args.server)
         else:
@@ -399,8 +644,13 @@ def main():
         sys.exit(0 if success else 1)
     
     elif args.command == "status":
-        status = asyncio.run(manager.get_system_status())
-        print(json.dumps(status, indent=2))
+        status = asyncio.run(manager._status_once())
+        try:
+            import orjson
+        except ImportError:
+            print(json.dumps(status, indent=2))
+        else:
+            sys.stdout.buffer.write(orjson.dumps(status, option=orjson.OPT_INDENT_2) + b"\n")
         sys.exit(0)
     
     elif args.command == "monitor":
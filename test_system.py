@@ -1,69 +1,158 @@
 #!/usr/bin/env python3
 """
-Quick Test Script for Multi-Level Summarization System
-Run this to verify your system is working correctly
+Test Script for Multi-Level Summarization System
+Run this to verify your system is working correctly, step by step:
+health checks, ingestion, L2 and L3 summarization, then query routing
 """
 
 import asyncio
 import httpx
-import json
-import time
 
 
-async def test_system():
-    """Test the multi-level summarization system"""
-    
+# Test endpoints
+ENDPOINTS = [
+    ("http://localhost:8000", "Orchestrator"),
+    ("http://localhost:8001", "Server 1 (L1 Summary)"),
+    ("http://localhost:8002", "Server 2 (L2 Summary)"),
+    ("http://localhost:8003", "Server 3 (L3 Summary)")
+]
+
+TEST_QUERIES = [
+    "What are the key points about Jharkhand policies?",
+    "Give me a summary of the MSME promotion policy",
+    "What are the specific requirements in the industrial policy?"
+]
+
+
+async def check_health(client: httpx.AsyncClient):
+    """Step 1: probe every server at once; returns the healthy ones"""
+    print("\n🏥 Step 1: Health Checks")
+    print("-" * 30)
+
+    # One wedged server shouldn't delay the rest
+    results = await asyncio.gather(
+        *(client.get(f"{url}/health", timeout=5.0) for url, _ in ENDPOINTS),
+        return_exceptions=True
+    )
+
+    healthy_servers = []
+    for (url, name), response in zip(ENDPOINTS, results):
+        if isinstance(response, Exception):
+            print(f"❌ {name}: {str(response)}")
+        elif response.status_code == 200:
+            print(f"✅ {name}: Healthy")
+            healthy_servers.append((url, name))
+        else:
+            print(f"❌ {name}: HTTP {response.status_code}")
+    return healthy_servers
+
+
+async def run_ingestion(client: httpx.AsyncClient):
+    """Step 2: ingest the PDFs on Server 1"""
+    print("\n📚 Step 2: Document Ingestion")
+    print("-" * 30)
+
+    try:
+        print("Triggering PDF ingestion on Server 1...")
+        response = await client.post("http://localhost:8001/ingest")
+        if response.status_code == 200:
+            data = response.json()
+            print(f"✅ Ingestion successful!")
+            print(f"   - Chunks processed: {data.get('chunks', 'N/A')}")
+            print(f"   - Vectors added: {data.get('vectors_added', 'N/A')}")
+            print(f"   - Processing time: {data.get('processing_time', 'N/A'):.2f}s")
+        else:
+            print(f"❌ Ingestion failed: HTTP {response.status_code}")
+            print(f"   Response: {response.text}")
+    except Exception as e:
+        print(f"❌ Ingestion error: {str(e)}")
+
+
+async def run_summarization(client: httpx.AsyncClient, level: int, port: int, icon: str):
+    """Steps 3 and 4: build the L{level} summary from L{level-1}"""
+    prev = level - 1
+    print(f"\n{icon} Step {level + 1}: L{level} Summarization")
+    print("-" * 30)
+
+    try:
+        print(f"Creating L{level} summary from L{prev}...")
+        response = await client.post(f"http://localhost:{port}/summarize_l{prev}")
+        if response.status_code == 200:
+            data = response.json()
+            print(f"✅ L{level} summarization successful!")
+            print(f"   - L{prev} length: {data.get(f'l{prev}_length', 'N/A')} chars")
+            print(f"   - L{level} length: {data.get(f'l{level}_length', 'N/A')} chars")
+            print(f"   - Compression ratio: {data.get('compression_ratio', 'N/A'):.2f}")
+        else:
+            print(f"❌ L{level} summarization failed: HTTP {response.status_code}")
+    except Exception as e:
+        print(f"❌ L{level} summarization error: {str(e)}")
+
+
+async def run_queries(client: httpx.AsyncClient):
+    """Step 5: send the test queries through the orchestrator's router"""
+    print("\n🧠 Step 5: Intelligent Query Routing")
+    print("-" * 30)
+
+    for i, query in enumerate(TEST_QUERIES, 1):
+        try:
+            print(f"\nQuery {i}: {query}")
+            response = await client.post(
+                "http://localhost:8000/query",
+                json={"question": query},
+                timeout=30.0
+            )
+
+            if response.status_code == 200:
+                data = response.json()
+                routing_info = data.get('routing_info', {})
+                server = routing_info.get('primary_server', 'unknown')
+                complexity = routing_info.get('complexity', 'unknown')
+
+                print(f"✅ Routed to: {server} ({complexity})")
+
+                # Show answer preview
+                answer = data.get('answer', '')
+                preview = answer[:150] + "..." if len(answer) > 150 else answer
+                print(f"💬 Answer: {preview}")
+
+                # Show citations
+                citations = data.get('citations', [])
+                print(f"📚 Citations: {len(citations)} sources")
+            else:
+                print(f"❌ Query failed: HTTP {response.status_code}")
+        except Exception as e:
+            print(f"❌ Query error: {str(e)}")
+
+
+async def run_system_test():
+    """Test the multi-level summarization system step by step"""
+
     print("🧪 Testing Multi-Level Summarization System")
-    print("=" * 50)
-    
-    # Test endpoints
-    endpoints = [
-        ("http://localhost:8000", "Orchestrator"),
-        ("http://localhost:8001", "Server 1 (L1 Summary)"),
-        ("http://localhost:8002", "Server 2 (L2 Summary)"),
-        ("http://localhost:8003", "Server 3 (L3 Summary)")
-    ]
-    
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        # Test health endpoints
-        print("\n🏥 Health Checks:")
-        for url, name in endpoints:
-            try:
-                response = await client.get(f"{url}/health")
-                if response.status_code == 200:
-                    print(f"✅ {name}: Healthy")
-                else:
-                    print(f"❌ {name}: HTTP {response.status_code}")
-            except Exception as e:
-                print(f"❌ {name}: {str(e)}")
-        
-        # Test intelligent query routing
-        print("\n🧠 Testing Intelligent Query Routing:")
-        test_queries = [
-            "What are the key points?",
-            "Give me a summary of the policies",
-            "What are the specific requirements?"
-        ]
-        
-        for query in test_queries:
-            try:
-                response = await client.post(
-                    "http://localhost:8000/query",
-                    json={"question": query}
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    routing_info = data.get('routing_info', {})
-                    server = routing_info.get('primary_server', 'unknown')
-                    complexity = routing_info.get('complexity', 'unknown')
-                    print(f"✅ Query: '{query}' → {server} ({complexity})")
-                else:
-                    print(f"❌ Query failed: HTTP {response.status_code}")
-            except Exception as e:
-                print(f"❌ Query error: {str(e)}")
-    
-    print("\n🎉 Test completed!")
+    print("=" * 60)
+
+    # One client for every step, so all of them share its connection pool
+    async with httpx.AsyncClient(timeout=60.0, http2=True) as client:
+        healthy_servers = await check_health(client)
+        if not healthy_servers:
+            print("\n❌ No servers are running. Please start the system first:")
+            print("   python manage_system.py start")
+            return
+
+        print(f"\n✅ {len(healthy_servers)} servers are healthy")
+
+        await run_ingestion(client)
+        await run_summarization(client, level=2, port=8002, icon="📝")
+        await run_summarization(client, level=3, port=8003, icon="📄")
+        await run_queries(client)
+
+    print("\n🎉 Testing completed!")
+    print("\n💡 System is ready for use!")
+
+
+def main():
+    asyncio.run(run_system_test())
 
 
 if __name__ == "__main__":
-    asyncio.run(test_system())
+    main()